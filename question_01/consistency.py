@@ -0,0 +1,144 @@
+import json
+import re
+import zlib
+from collections import Counter
+import numpy as np
+from json_repair import repair_json
+from eval import Evaluator
+
+# Trailing/leading characters that don't change an answer ("Cairo" == "cairo.")
+_PUNCTUATION = " .,;:!?\"'`"
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+class ConsistencyAnalyzer:
+    """Semantic consistency of repeated model responses.
+
+    Every distinct response is reduced once (memoized) to a canonical form
+    with `Evaluator.normalize_text` / `normalize_json`. The distinct forms are
+    embedded as L2-normalized hashed character n-gram vectors and
+    clustered greedily (most frequent first) by cosine similarity. Everything
+    after canonicalization works on the distinct forms weighted by their
+    counts, so thousands of runs per case cost about as much as the number
+    of different answers.
+    """
+
+    def __init__(self, threshold=0.8, ngram=3, dim=4096):
+        """
+        Args: threshold (float): cosine similarity at which two canonical forms join the same cluster
+              ngram (int): character n-gram size of the hashed vectors
+              dim (int): number of hash buckets
+        """
+        self.threshold = threshold
+        self.ngram = ngram
+        self.dim = dim
+        self._canonical = {}
+
+    def canonical(self, resp, match_type=None):
+        """Canonical form of a response for `match_type` ("json", "sql" or text), memoized."""
+        key = (match_type, resp)
+        form = self._canonical.get(key)
+        if form is None:
+            form = self._canonicalize(resp, match_type)
+            self._canonical[key] = form
+        return form
+
+    @staticmethod
+    def _canonicalize(resp, match_type):
+        if match_type == "json":
+            try:
+                parsed = json.loads(resp)
+            except Exception:
+                parsed = repair_json(resp, return_objects=True)
+            # unrepairable output comes back as "": compare it as text instead
+            if parsed != "":
+                return json.dumps(Evaluator.normalize_json(parsed), sort_keys=True, ensure_ascii=False)
+        if match_type == "sql":
+            resp = Evaluator.clean_sql(resp or "").rstrip(";")
+        return Evaluator.normalize_text(resp).strip(_PUNCTUATION)
+
+    def vectors(self, forms):
+        """L2-normalized hashed character n-gram counts, one row per form."""
+        rows, buckets = [], []
+        for i, form in enumerate(forms):
+            padded = f" {form} "
+            grams = {padded[j:j + self.ngram] for j in range(max(1, len(padded) - self.ngram + 1))}
+            rows.extend([i] * len(grams))
+            # crc32 rather than hash(): stable across processes
+            buckets.extend(zlib.crc32(g.encode("utf-8")) % self.dim for g in grams)
+        matrix = np.zeros((len(forms), self.dim), dtype=np.float32)
+        np.add.at(matrix, (np.asarray(rows, dtype=np.int64), np.asarray(buckets, dtype=np.int64)), 1.0)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def cluster(self, forms, counts):
+        """Cluster label per form: each form joins the most similar existing leader at or above
+        `threshold`, otherwise it leads a new cluster. Forms are visited most frequent first.
+        Forms mentioning different numbers never share a cluster ("5 apples" vs "6 apples")."""
+        if not forms:
+            return np.empty(0, dtype=np.int64)
+        x = self.vectors(forms)
+        similarity = x @ x.T
+        numbers = {}
+        signature = np.asarray([numbers.setdefault(tuple(_NUMBER.findall(f)), len(numbers)) for f in forms])
+        similarity[signature[:, None] != signature[None, :]] = -1.0
+        labels = np.full(len(forms), -1, dtype=np.int64)
+        leaders = []
+        for i in np.argsort(-np.asarray(counts), kind="stable"):
+            if leaders:
+                sims = similarity[i, leaders]
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    labels[i] = labels[leaders[best]]
+                    continue
+            labels[i] = len(leaders)
+            leaders.append(i)
+        return labels
+
+    def analyze(self, per_prompt_responses, match_type=None):
+        """Consistency of a test case's responses, given one list of responses per prompt variant
+        (the original prompt first).
+        Returns: dict with
+            canonical_consistency: share of the most common canonical form
+            semantic_consistency: share of the largest similarity cluster
+            n_clusters: number of clusters
+            variant_agreement: probability that responses to two different variants fall in the same
+                cluster (None with a single prompt)
+            variant_drift: per variant, total variation distance between its cluster distribution
+                and the original prompt's (0 = same answers, 1 = disjoint); None for a variant with no
+                responses, or for every variant when the original prompt has none
+        """
+        canonical = [[self.canonical(r, match_type) for r in responses] for responses in per_prompt_responses]
+        freq = Counter(form for forms in canonical for form in forms)
+        total = sum(freq.values())
+        if not total:
+            return {"canonical_consistency": 0.0, "semantic_consistency": 0.0, "n_clusters": 0,
+                    "variant_agreement": None, "variant_drift": [None for _ in per_prompt_responses]}
+        forms = list(freq)
+        labels = self.cluster(forms, [freq[f] for f in forms])
+        label_of = dict(zip(forms, labels.tolist()))
+        n_clusters = int(labels.max()) + 1
+
+        # cluster distribution per variant: (n_variants, n_clusters)
+        dist = np.zeros((len(canonical), n_clusters))
+        for v, forms_v in enumerate(canonical):
+            for form in forms_v:
+                dist[v, label_of[form]] += 1
+        sizes = dist.sum(axis=0)
+        dist /= np.maximum(dist.sum(axis=1, keepdims=True), 1)
+
+        agreement = None
+        answered = [v for v, forms_v in enumerate(canonical) if forms_v]
+        if len(answered) > 1:
+            pairs = dist[answered] @ dist[answered].T
+            agreement = float(pairs[np.triu_indices(len(answered), k=1)].mean())
+        # an empty variant has an all-zero row, which would read as a drift of 0.5 rather than "no data"
+        drift = 0.5 * np.abs(dist - dist[0]).sum(axis=1)
+        drift = [round(float(d), 6) if canonical[v] and canonical[0] else None for v, d in enumerate(drift)]
+        return {
+            "canonical_consistency": freq.most_common(1)[0][1] / total,
+            "semantic_consistency": float(sizes.max() / total),
+            "n_clusters": n_clusters,
+            "variant_agreement": agreement,
+            "variant_drift": drift,
+        }
@@ -1,11 +1,31 @@
 import re
 import json
 import sqlite3
+import time
 import types
 from collections import Counter
 from json_repair import repair_json
 
+# Authorizer actions a candidate query may perform; everything else (writes, DDL, PRAGMA, ATTACH,
+# transactions) is denied. Statements are authorized when prepared, so a denied one never runs.
+READ_ONLY_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION,
+                     getattr(sqlite3, "SQLITE_RECURSIVE", 33)}
+
+def _read_only_authorizer(action, *args):
+    return sqlite3.SQLITE_OK if action in READ_ONLY_ACTIONS else sqlite3.SQLITE_DENY
+
 class Evaluator:
+    def __init__(self, timeout_s=2.0, max_rows=10_000):
+        """
+        Args: timeout_s (float): per-statement time limit for candidate SQL queries
+              max_rows (int): candidate SQL results longer than this fail instead of being fetched
+        """
+        self.timeout_s = timeout_s
+        self.max_rows = max_rows
+        # per test case: setup statements -> fixture connection, (setup, reference query) -> reference rows
+        self._fixtures = {}
+        self._references = {}
+
     @staticmethod
     def normalize_text(x):
         """Normalize text by removing extra whitespace and converting to lowercase."""
@@ -36,28 +56,58 @@ class Evaluator:
         """Evaluate exact text match after normalization."""
         return self.normalize_text(resp) == self.normalize_text(expected)
 
+    def _fixture(self, setup):
+        """Connection holding the case's fixture database, built once per distinct `setup` and then read-only."""
+        conn = self._fixtures.get(setup)
+        if conn is None:
+            conn = sqlite3.connect(":memory:")
+            for s in setup:
+                conn.execute(s)
+            conn.commit()
+            # candidates can't modify the fixture, so one connection serves every run of the case;
+            # query_only alone isn't enough, since a candidate could run "PRAGMA query_only = 0"
+            conn.execute("PRAGMA query_only = ON")
+            conn.set_authorizer(_read_only_authorizer)
+            self._fixtures[setup] = conn
+        return conn
+
+    def _run_query(self, conn, query, max_rows):
+        """Run `query` with the statement timeout; returns at most `max_rows` + 1 rows so overflow is detectable."""
+        deadline = time.perf_counter() + self.timeout_s
+        conn.set_progress_handler(lambda: time.perf_counter() > deadline, 1000)
+        try:
+            return conn.execute(query).fetchmany(max_rows + 1)
+        finally:
+            conn.set_progress_handler(None, 0)
+
     def eval_sql(self, resp_query, validation):
         """Evaluate SQL query against reference implementation."""
-        conn = sqlite3.connect(":memory:")
-        cur = conn.cursor()
+        setup = tuple(validation.get("setup", []))
+        conn = self._fixture(setup)
+        key = (setup, validation.get("reference_query"))
+        if key not in self._references:
+            ref_rows = conn.execute(validation.get("reference_query")).fetchall()
+            self._references[key] = (ref_rows, sorted(ref_rows))
+        ref_rows, sorted_ref = self._references[key]
+        # never cap below the reference, or a correct answer could not match
+        max_rows = max(self.max_rows, len(ref_rows))
+        cleaned_query = self.clean_sql(resp_query)
+        # run returned query - if it fails, times out or returns too many rows, return False
         try:
-            for s in validation.get("setup", []):
-                cur.execute(s)
-            conn.commit()
-            cleaned_query = self.clean_sql(resp_query)
-            # run returned query - if it fails, return False
-            try:
-                cur.execute(cleaned_query)
-                resp_rows = cur.fetchall()
-            except Exception as e:
-                return False, {"error": str(e)}
-            # run reference
-            cur.execute(validation.get("reference_query"))
-            ref_rows = cur.fetchall()
-            # compare sorted sets (order not important)
-            return sorted(resp_rows) == sorted(ref_rows), {"resp_rows": resp_rows, "ref_rows": ref_rows}
-        finally:
+            resp_rows = self._run_query(conn, cleaned_query, max_rows)
+        except Exception as e:
+            return False, {"error": str(e)}
+        if len(resp_rows) > max_rows:
+            return False, {"error": f"query returned more than {max_rows} rows"}
+        # compare sorted sets (order not important)
+        return sorted(resp_rows) == sorted_ref, {"resp_rows": resp_rows, "ref_rows": ref_rows}
+
+    def close(self):
+        """Release the cached fixture databases."""
+        for conn in self._fixtures.values():
             conn.close()
+        self._fixtures.clear()
+        self._references.clear()
 
     def eval_json(self, resp, expected):
         """Evaluate JSON response against expected JSON."""
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+CACHE_MODES = ("record", "replay", "refresh")
+
+
+class CacheMiss(KeyError):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+class ResponseCache:
+    """Raw model completions on disk in SQLite, keyed by a hash of the request.
+
+    Modes:
+        record:  serve recorded completions, call the model (and record) on a miss
+        replay:  serve recorded completions only; a miss raises CacheMiss, so no network is needed
+        refresh: always call the model and overwrite what was recorded
+
+    The raw completion is stored (not the extracted answer), so changes to
+    answer extraction or evaluation can be rerun offline against the
+    recording. One connection is shared by the harness worker threads
+    behind a lock.
+    """
+
+    def __init__(self, path="responses.sqlite", mode="record"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"cache mode must be one of {CACHE_MODES}")
+        self.path = path
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, temperature REAL, run_index INTEGER, "
+            "prompt TEXT, raw_output TEXT, created_at REAL)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def key(prompt, model_name, temperature, max_tokens, run_index=0):
+        """Stable hash of everything that determines a completion, including which repeated run it is."""
+        request = [prompt, model_name, temperature, max_tokens, run_index]
+        return hashlib.sha256(json.dumps(request, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def __contains__(self, key):
+        """Whether `get(key)` would be served from the cache (always False in refresh mode)."""
+        if self.mode == "refresh":
+            return False
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone() is not None
+
+    def get(self, key):
+        """Recorded raw completion for `key`, or None when the model should be called."""
+        if self.mode == "refresh":
+            return None
+        with self.lock:
+            row = self.conn.execute("SELECT raw_output FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if row is None and self.mode == "replay":
+            raise CacheMiss(f"no recorded response for request {key[:12]} (replay mode)")
+        return row[0] if row else None
+
+    def put(self, key, raw_output, prompt, model_name, temperature, run_index=0):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model_name, temperature, run_index, prompt, raw_output, time.time()),
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,115 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import openai
+
+# Errors worth retrying: rate limits, timeouts / dropped connections and 5xx responses
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+
+class RateLimiter:
+    """Token buckets for requests per minute and (estimated) tokens per minute, shared by all worker threads.
+
+    Each bucket holds up to one minute's allowance and refills continuously;
+    `acquire` blocks until both buckets can cover the call. A limit of None
+    disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.limits = {"requests": requests_per_minute, "tokens": tokens_per_minute}
+        self.levels = {name: float(limit or 0) for name, limit in self.limits.items()}
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        for name, limit in self.limits.items():
+            if limit:
+                self.levels[name] = min(limit, self.levels[name] + elapsed * limit / 60.0)
+
+    def acquire(self, tokens=0):
+        """Block until one request using `tokens` tokens is allowed, then spend it."""
+        need = {"requests": 1, "tokens": tokens}
+        while True:
+            with self.lock:
+                self._refill()
+                # a call bigger than a whole bucket would wait forever; let it through once the bucket is full
+                need = {name: min(n, self.limits[name] or 0) for name, n in need.items()}
+                wait = max(
+                    ((need[name] - self.levels[name]) * 60.0 / limit for name, limit in self.limits.items() if limit),
+                    default=0.0,
+                )
+                if wait <= 0:
+                    for name, limit in self.limits.items():
+                        if limit:
+                            self.levels[name] -= need[name]
+                    return
+            time.sleep(wait)
+
+
+def estimate_tokens(prompt, max_tokens=600):
+    """Rough token cost of one call for the limiter: ~4 characters per prompt token plus the completion budget."""
+    return len(prompt) // 4 + max_tokens
+
+
+def _retry_after(error):
+    """Seconds the server asked us to wait (Retry-After header), if any."""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def call_with_retry(fn, prompt, limiter=None, max_retries=3, backoff_s=1.0, max_backoff_s=30.0):
+    """Call `fn(prompt)` through the rate limiter, retrying transient API errors with jittered exponential backoff.
+    Args: fn: callable taking the prompt and returning the answer
+          limiter (RateLimiter): shared limiter, or None for no rate limiting
+          max_retries (int): retries after the first attempt for RETRYABLE_ERRORS; other errors raise at once
+    Returns: (answer, latency_s) where latency_s is the `time.perf_counter` duration of the final attempt only,
+             excluding time spent waiting on the limiter or backing off
+    """
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire(estimate_tokens(prompt))
+        t0 = time.perf_counter()
+        try:
+            return fn(prompt), time.perf_counter() - t0
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = _retry_after(e)
+            if delay is None:
+                delay = min(max_backoff_s, backoff_s * 2 ** attempt) * random.uniform(0.5, 1.0)
+            time.sleep(delay)
+
+
+def run_concurrently(fn, prompts, concurrency=8, limiter=None, max_retries=3, on_result=None, limited=None):
+    """Run `fn(prompt, index)` over `prompts` on a thread pool of `concurrency` workers.
+    Args: on_result: optional callback(index, answer, error) invoked as each call finishes
+          limited: optional per-prompt flags; calls flagged False (e.g. cache hits) bypass the limiter
+    Returns: list of (answer, latency_s, error) in the order of `prompts`; error is None on success,
+             otherwise the exception and latency_s is the time until it was raised
+    """
+    results = [None] * len(prompts)
+
+    def task(i, prompt):
+        t0 = time.perf_counter()
+        use_limiter = limiter if limited is None or limited[i] else None
+        try:
+            answer, latency = call_with_retry(lambda p: fn(p, i), prompt, use_limiter, max_retries)
+            return answer, latency, None
+        except Exception as e:
+            return None, time.perf_counter() - t0, e
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(task, i, prompt): i for i, prompt in enumerate(prompts)}
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            if on_result is not None:
+                on_result(i, results[i][0], results[i][2])
+    return results
@@ -2,9 +2,13 @@ from openai import OpenAI
 import os
 from dotenv import load_dotenv
 import json
-import time
 from collections import Counter
 from eval import Evaluator
+from consistency import ConsistencyAnalyzer
+from response_cache import CacheMiss, ResponseCache
+from runner import RateLimiter, run_concurrently
+
+MAX_TOKENS = 600
 
 def extract_answer(text):
     """Extract text between <answer> and </answer> tags.
@@ -21,28 +25,36 @@ def extract_answer(text):
     except ValueError:
         return ""
 
-def call_model(prompt,llm, model_name="gpt-4.1-mini", temperature=0.5):
+def call_model(prompt,llm, model_name="gpt-4.1-mini", temperature=0.5, cache=None, run_index=0):
     """Call the language model and extract the answer from response.
     Args: prompt (str): the input prompt to the model
-            llm : an instance of OpenAI client
+            llm : an instance of OpenAI client (unused when the cache serves the request)
            model_name (str): the model name to be used ( default "gpt-4.1-mini" )
            temperature (float): the temperature of the model ( default 0.5 )
+           cache (ResponseCache): optional recorded completions, see `ResponseCache` for the modes
+           run_index (int): which repeated run of the prompt this is, so each run is recorded separately
     Returns: the final answer which is between the `answer` tags or empty string if not found
            """
-    resp = llm.chat.completions.create(
-        model=model_name,
-        messages=[{"role":"user","content":prompt}],
-        temperature=temperature,
-        max_tokens=600
-    )
-    raw_output = resp.choices[0].message.content.strip()
+    key = ResponseCache.key(prompt, model_name, temperature, MAX_TOKENS, run_index)
+    raw_output = cache.get(key) if cache is not None else None
+    if raw_output is None:
+        resp = llm.chat.completions.create(
+            model=model_name,
+            messages=[{"role":"user","content":prompt}],
+            temperature=temperature,
+            max_tokens=MAX_TOKENS
+        )
+        raw_output = resp.choices[0].message.content.strip()
+        if cache is not None:
+            cache.put(key, raw_output, prompt, model_name, temperature, run_index)
     final_answer = extract_answer(raw_output)
     return final_answer
 
-def run_harness(cases_file,llm, n_runs=5, output_file=None):
+def run_harness(cases_file,llm, n_runs=5, output_file=None, concurrency=8, requests_per_minute=None,
+                tokens_per_minute=None, max_retries=3, cache=None):
     """
     1. Load test cases from JSON file
-    2. For each test case, run the prompt for n times
+    2. Run every prompt of every test case n times, `concurrency` calls at a time
     3. Collect responses, latencies
     4. Compute consistency metrics
     5. Evaluate each response vs expected according to match_type
@@ -52,12 +64,59 @@ def run_harness(cases_file,llm, n_runs=5, output_file=None):
         llm: an instance of OpenAI client
         n_runs (int): number of times to run each prompt
         output_file (str): path to write results JSON (if None, don't write)
+        concurrency (int): number of model calls in flight at once
+        requests_per_minute / tokens_per_minute: client-side rate limits (None = unlimited)
+        max_retries (int): retries with backoff for rate-limit, connection and server errors
+        cache (ResponseCache): optional response cache; cached calls skip the rate limiter. In replay
+                               mode a request missing from the recording raises CacheMiss
     Returns: dict with summary and detailed results
     """
     with open(cases_file, "r", encoding="utf-8") as f:
         cases = json.load(f)
 
+    # Every (case, prompt, run) call is dispatched up front; results are regrouped in the original order below.
+    jobs = [
+        (case_idx, prompt, run)
+        for case_idx, test_case in enumerate(cases)
+        for prompt in [test_case.get("prompt")] + test_case.get("variants", [])
+        for run in range(n_runs)
+    ]
+
+    model_name, temperature = "gpt-4.1-mini", 0.5
+    # which calls the cache will serve: they skip the rate limiter and are logged as cached
+    cached = [False] * len(jobs)
+    if cache is not None:
+        cached = [ResponseCache.key(prompt, model_name, temperature, MAX_TOKENS, run) in cache for _, prompt, run in jobs]
+        if cache.mode == "replay" and not all(cached):
+            # a stale recording must fail the run, not be scored as failed answers
+            raise CacheMiss(f"{cached.count(False)} of {len(jobs)} calls have no recorded response (replay mode); "
+                            "re-record with HARNESS_CACHE_MODE=record")
+
+    def on_result(i, resp, error):
+        if error is None:
+            case_idx, _, run = jobs[i]
+            print(f"[{cases[case_idx].get('id')}] Run {run+1}/{n_runs} ({'cached' if cached[i] else 'live'}): {resp}")
+
+    if cache is None:
+        print(f"Response cache off: all {len(jobs)} calls go to the model")
+    else:
+        print(f"Response cache {cache.path} ({cache.mode} mode): {cached.count(True)} of {len(jobs)} calls "
+              f"served from recorded completions, {cached.count(False)} sent to the model")
+
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute) if requests_per_minute or tokens_per_minute else None
+    call_results = run_concurrently(
+        lambda prompt, i: call_model(prompt, llm, model_name, temperature, cache=cache, run_index=jobs[i][2]),
+        [prompt for _, prompt, _ in jobs],
+        concurrency=concurrency, limiter=limiter, max_retries=max_retries, on_result=on_result,
+        limited=[not c for c in cached],
+    )
+    for _, _, error in call_results:
+        if isinstance(error, CacheMiss):
+            raise error
+    calls = iter(call_results)
+
     evaluator = Evaluator()
+    analyzer = ConsistencyAnalyzer()
     results = []
     summary = {"cases": 0, "total_runs": 0, "passes": 0}
 
@@ -70,14 +129,10 @@ def run_harness(cases_file,llm, n_runs=5, output_file=None):
         for prompt in prompts:
             p_responses = []
             latencies = []
-            for i in range(n_runs):
-                t0 = time.time()
-                try:
-                    resp = call_model(prompt,llm, temperature=0.5)
-                    print(f"[{case_id}] Run {i+1}/{n_runs} (live): {resp}")
-                except Exception as e:
-                    resp = f"[ERROR_CALL_MODEL] {e}"
-                dt = time.time() - t0
+            for _ in range(n_runs):
+                resp, dt, error = next(calls)
+                if error is not None:
+                    resp = f"[ERROR_CALL_MODEL] {error}"
                 p_responses.append(resp)
                 latencies.append(dt)
             per_prompt_records.append({"prompt": prompt, "responses": p_responses, "latencies": latencies})
@@ -89,11 +144,16 @@ def run_harness(cases_file,llm, n_runs=5, output_file=None):
         consistency = mode_count / (len(all_responses) if all_responses else 1)
         unique_outputs = len(freq)
 
-        # evaluate each response vs expected according to match_type
+        analysis = analyzer.analyze([pr["responses"] for pr in per_prompt_records], test_case.get("match_type"))
+
+        # evaluate each response vs expected according to match_type (once per distinct response)
         pass_count = 0
         details = []
+        evaluated = {}
         for resp in all_responses:
-            ok, meta = evaluator.evaluate_response(resp, test_case)
+            if resp not in evaluated:
+                evaluated[resp] = evaluator.evaluate_response(resp, test_case)
+            ok, meta = evaluated[resp]
             pass_count += 1 if ok else 0
             details.append({"response": resp, "pass": ok, "meta": meta})
 
@@ -110,6 +170,8 @@ def run_harness(cases_file,llm, n_runs=5, output_file=None):
             "mode_response": mode_resp,
             "mode_count": mode_count,
             "consistency": consistency,
+            "semantic_consistency": analysis["semantic_consistency"],
+            "consistency_analysis": analysis,
             "pass_rate": pass_rate,
             "avg_latency_s": avg_latency,
             "per_prompt": per_prompt_records,
@@ -121,9 +183,12 @@ def run_harness(cases_file,llm, n_runs=5, output_file=None):
         summary["total_runs"] += len(all_responses)
         summary["passes"] += pass_count
 
-        print(f"[{case_id}] runs={len(all_responses)} unique={unique_outputs} consistency={consistency:.2f} pass_rate={pass_rate:.2f} avg_latency={avg_latency:.3f}s")
+        print(f"[{case_id}] runs={len(all_responses)} unique={unique_outputs} consistency={consistency:.2f} semantic={analysis['semantic_consistency']:.2f} pass_rate={pass_rate:.2f} avg_latency={avg_latency:.3f}s")
 
     summary["overall_pass_rate"] = summary["passes"] / summary["total_runs"] if summary["total_runs"] else 0.0
+    if cache is not None:
+        summary["cache"] = {"mode": cache.mode, "path": cache.path, "served_from_cache": cached.count(True),
+                            "live_calls": cached.count(False), "hits": cache.hits, "misses": cache.misses}
     print("\nSUMMARY:")
     print(json.dumps(summary, indent=2))
     out = {"summary": summary, "results": results}
@@ -139,6 +204,20 @@ if __name__ == "__main__":
     api_key = os.getenv("OPENAI_API_KEY")
     n_runs = 2
     cases_file = "test_cases.json"
-    llm = OpenAI(api_key=api_key)
+    # HARNESS_CACHE_MODE: refresh (default: always call the model, recording the completions), record (reuse
+    # recorded completions, call the model for the rest) or replay (recorded only, offline, e.g. CI).
+    # Reusing completions is opt-in, so a plain rerun never scores stale ones. HARNESS_CACHE=off disables it.
+    cache_path = os.getenv("HARNESS_CACHE", "responses.sqlite")
+    cache = ResponseCache(cache_path, os.getenv("HARNESS_CACHE_MODE", "refresh")) if cache_path != "off" else None
+    # retries are handled by the harness (with backoff), not inside the client; replay never calls the API
+    llm = None if cache is not None and cache.mode == "replay" else OpenAI(api_key=api_key, max_retries=0)
     output_file = "results.json"
-    run_harness(cases_file,llm=llm, n_runs=n_runs,  output_file=output_file)
+    rpm = os.getenv("HARNESS_RPM")
+    tpm = os.getenv("HARNESS_TPM")
+    run_harness(
+        cases_file, llm=llm, n_runs=n_runs, output_file=output_file,
+        concurrency=int(os.getenv("HARNESS_CONCURRENCY", "8")),
+        requests_per_minute=int(rpm) if rpm else None,
+        tokens_per_minute=int(tpm) if tpm else None,
+        cache=cache,
+    )
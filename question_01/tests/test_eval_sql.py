@@ -0,0 +1,75 @@
+import pytest
+from eval import Evaluator
+
+SETUP = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, age INTEGER)",
+    "INSERT INTO users VALUES (1, 'ada', 36), (2, 'alan', 41), (3, 'grace', 85)",
+]
+VALIDATION = {"setup": SETUP, "reference_query": "SELECT name FROM users WHERE age > 40"}
+
+
+@pytest.fixture
+def evaluator():
+    evaluator = Evaluator(timeout_s=0.5)
+    yield evaluator
+    evaluator.close()
+
+
+def test_matches_reference_in_any_order(evaluator):
+    ok, meta = evaluator.eval_sql("```sql\nSELECT name FROM users WHERE age >= 41 ORDER BY name DESC;\n```", VALIDATION)
+    assert ok
+    assert sorted(meta["resp_rows"]) == [("alan",), ("grace",)]
+    ok, _ = evaluator.eval_sql("SELECT name FROM users", VALIDATION)
+    assert not ok
+
+
+@pytest.mark.parametrize("query", [
+    "DELETE FROM users",
+    "UPDATE users SET age = 0",
+    "INSERT INTO users VALUES (4, 'eve', 50)",
+    "DROP TABLE users",
+    "CREATE TABLE t (x)",
+    "PRAGMA query_only = 0",
+    "ATTACH DATABASE ':memory:' AS other",
+    "BEGIN",
+])
+def test_authorizer_rejects_writes(evaluator, query):
+    ok, meta = evaluator.eval_sql(query, VALIDATION)
+    assert not ok and "error" in meta
+    # the shared fixture is untouched, so the next candidate still sees the original rows
+    ok, _ = evaluator.eval_sql("SELECT name FROM users WHERE age > 40", VALIDATION)
+    assert ok
+    assert evaluator._fixture(tuple(SETUP)).execute("SELECT count(*) FROM users").fetchone() == (3,)
+
+
+def test_recursive_queries_are_allowed(evaluator):
+    validation = {"setup": [], "reference_query": "SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3"}
+    query = "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 3) SELECT x FROM n"
+    ok, meta = evaluator.eval_sql(query, validation)
+    assert ok, meta
+
+
+def test_runaway_query_times_out(evaluator):
+    query = "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) SELECT count(*) FROM n"
+    ok, meta = evaluator.eval_sql(query, VALIDATION)
+    assert not ok
+    assert "interrupted" in meta["error"]
+    # the progress handler is removed afterwards, so later queries run normally
+    ok, _ = evaluator.eval_sql("SELECT name FROM users WHERE age > 40", VALIDATION)
+    assert ok
+
+
+def test_oversized_result_fails_without_fetching_everything():
+    evaluator = Evaluator(max_rows=5)
+    query = "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 100000) SELECT x FROM n"
+    ok, meta = evaluator.eval_sql(query, VALIDATION)
+    evaluator.close()
+    assert not ok
+    assert meta["error"] == "query returned more than 5 rows"
+
+
+def test_fixture_and_reference_are_built_once(evaluator):
+    for _ in range(3):
+        evaluator.eval_sql("SELECT name FROM users WHERE age > 40", VALIDATION)
+    assert len(evaluator._fixtures) == 1
+    assert len(evaluator._references) == 1
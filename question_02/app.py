@@ -1,7 +1,11 @@
+import os
+import json
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import retriever
+from routers import admin, corpus, retriever
 from data_retriever.retriever import SimpleRetriever
+from data_retriever.embeddings import build_embedding_model
+from data_retriever.metrics import configure_tracing
 from database.simple_data import SIMPLE_SNIPPETS
 from prometheus_fastapi_instrumentator import Instrumentator
 from middlewares.profiler import profile_http_middleware
@@ -9,9 +13,41 @@ from middlewares.error_tracker import error_tracking_middleware
 
 
 instrumentator = Instrumentator()
-simple_retriever = SimpleRetriever(
-    snippets=SIMPLE_SNIPPETS
+# OTEL_EXPORTER_OTLP_ENDPOINT (e.g. http://localhost:4318) exports per-stage retrieval spans to a
+# collector; needs opentelemetry-sdk and opentelemetry-exporter-otlp-proto-http installed.
+if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") or os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT"):
+    configure_tracing(os.getenv("OTEL_SERVICE_NAME", "retrieval-service"))
+# EMBEDDING_BACKEND=local runs a sentence-transformers model on CPU, fully offline
+embedding_backend = os.getenv("EMBEDDING_BACKEND", "openai")
+embedding_kwargs = {}
+if embedding_backend == "local":
+    embedding_kwargs = {
+        "model_name": os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"),
+        "num_threads": int(os.getenv("EMBEDDING_THREADS", "0")) or None,
+        "backend": os.getenv("LOCAL_EMBEDDING_RUNTIME", "torch"),
+    }
+elif embedding_backend == "hash":  # deterministic and offline, for load tests
+    embedding_kwargs = {"dim": int(os.getenv("HASH_EMBEDDING_DIM", "256"))}
+# Set EAGER_INDEX_BUILD=1 to embed the corpus at startup instead of on the first dense query.
+# INDEX_CACHE_DIR keeps embeddings and index snapshots on disk, shared by all workers on the host.
+retriever_kwargs = dict(
+    embedding_model=build_embedding_model(embedding_backend, **embedding_kwargs),
+    eager=os.getenv("EAGER_INDEX_BUILD", "0") == "1",
+    cache_dir=os.getenv("INDEX_CACHE_DIR") or None,
+    cache_size=int(os.getenv("QUERY_CACHE_SIZE", "1024")),
+    cache_ttl=float(os.getenv("QUERY_CACHE_TTL", "300")),
+    batch_window_ms=float(os.getenv("EMBED_BATCH_WINDOW_MS", "3")),
+    max_batch_size=int(os.getenv("EMBED_MAX_BATCH_SIZE", "32")),
+    # flat | ivf_flat | hnsw | ivf_pq, with e.g. ANN_INDEX_PARAMS='{"nlist": 4096, "nprobe": 16}'
+    index_type=os.getenv("ANN_INDEX_TYPE", "flat"),
+    index_params=json.loads(os.getenv("ANN_INDEX_PARAMS", "{}")),
 )
+# CORPUS_DIR serves a corpus ingested with `python -m data_retriever.bulk_loader` instead of SIMPLE_SNIPPETS
+corpus_dir = os.getenv("CORPUS_DIR")
+if corpus_dir:
+    simple_retriever = SimpleRetriever.from_bulk(corpus_dir, **retriever_kwargs)
+else:
+    simple_retriever = SimpleRetriever(snippets=SIMPLE_SNIPPETS, **retriever_kwargs)
 
 app = FastAPI(title="Retrieval Service",version="1.0.0",
     swagger_ui_parameters={"docExpansion": "none"},
@@ -28,6 +64,8 @@ app.add_middleware(
 app.state.simple_retriever = simple_retriever
 
 app.include_router(retriever.router, prefix="/retriever", tags=["Retriever"])
+app.include_router(corpus.router, prefix="/corpus", tags=["Corpus"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 
 @app.get("/")
 def root():
@@ -0,0 +1,97 @@
+"""Saving benchmark results as JSON baselines and checking new results against them."""
+import json
+import os
+import platform
+import time
+from typing import Dict, List, Sequence
+import faiss
+import numpy as np
+
+# Result fields where higher is worse / where lower is worse. p99 is reported but not gated: with a few
+# hundred samples per run it is a handful of requests and mostly scheduler noise.
+LATENCY_FIELDS = ("p50_ms", "p95_ms")
+THROUGHPUT_FIELDS = ("qps", "batch_qps", "rps")
+# Latency changes smaller than this are never regressions, whatever the relative change
+MIN_DELTA_MS = 0.25
+
+
+def environment() -> Dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "faiss": faiss.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def save_results(path: str, kind: str, rows: List[Dict], params: Dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"kind": kind, "environment": environment(), "params": params, "results": rows}, f, indent=2)
+
+
+def load_results(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(rows: List[Dict], baseline_rows: List[Dict], keys: Sequence[str], tolerance: float = 0.25,
+            min_delta_ms: float = MIN_DELTA_MS) -> List[Dict]:
+    """Regressions of `rows` against `baseline_rows`, matched on the `keys` fields.
+
+    A latency percentile regresses when it is more than `tolerance` (a fraction)
+    and more than `min_delta_ms` above the baseline, a throughput when it is
+    more than `tolerance` below it. Rows missing from either side are ignored.
+    Baselines are only comparable on the machine that recorded them (see
+    `environment` in the file).
+    """
+    baseline = {tuple(row.get(k) for k in keys): row for row in baseline_rows}
+    regressions = []
+    for row in rows:
+        base = baseline.get(tuple(row.get(k) for k in keys))
+        if base is None:
+            continue
+        for field in LATENCY_FIELDS + THROUGHPUT_FIELDS:
+            new, old = row.get(field), base.get(field)
+            if not new or not old:
+                continue
+            if field in LATENCY_FIELDS:
+                worse = new > old * (1 + tolerance) and new - old > min_delta_ms
+            else:
+                worse = new < old / (1 + tolerance)
+            if worse:
+                regressions.append({**{k: row.get(k) for k in keys}, "field": field, "baseline": old, "current": new,
+                                    "change": round(new / old - 1, 3)})
+    return regressions
+
+
+def percentiles(latencies_ms: Sequence[float]) -> Dict:
+    values = np.asarray(latencies_ms, dtype=np.float64)
+    if not len(values):
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 4), "p95_ms": round(float(p95), 4), "p99_ms": round(float(p99), 4)}
+
+
+def median_rows(runs: List[List[Dict]], keys: Sequence[str]) -> List[Dict]:
+    """Merge repeated runs into one row per `keys` combination, taking the median of every numeric field.
+
+    Single runs are noisy (a GC pause or a context switch can halve one run's
+    throughput); the median of a few repeats is what gets recorded and gated.
+    """
+    grouped: Dict[tuple, List[Dict]] = {}
+    for rows in runs:
+        for row in rows:
+            grouped.setdefault(tuple(row.get(k) for k in keys), []).append(row)
+    merged = []
+    for group in grouped.values():
+        row = dict(group[0])
+        for field, value in group[0].items():
+            values = [r.get(field) for r in group]
+            if field not in keys and isinstance(value, (int, float)) and all(isinstance(v, (int, float)) for v in values):
+                row[field] = round(float(np.median(values)), 4)
+        row["repeats"] = len(group)
+        merged.append(row)
+    return merged
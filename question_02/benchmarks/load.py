@@ -0,0 +1,150 @@
+"""HTTP load generator for the retrieval service.
+
+`--concurrency` closed-loop workers send requests round-robin over the
+selected endpoints for `--duration` seconds, `--repeats` times. Per endpoint
+(and overall) it reports the median over the repeats of throughput, error
+count and p50/p95/p99 latency.
+
+By default the app is driven in-process through httpx's ASGI transport with
+the offline `hash` embedding backend and a synthetic corpus, so it runs
+with no network. Middlewares and routers are exercised but there is no real
+socket or server, so use `--url` against a running uvicorn/gunicorn for
+end-to-end numbers:
+
+    python -m benchmarks.load --corpus-size 100000 --concurrency 32 --output benchmarks/baselines/load.json
+    EMBEDDING_BACKEND=hash uvicorn app:app --workers 4 &
+    python -m benchmarks.load --url http://127.0.0.1:8000 --concurrency 64 --duration 30
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Sequence
+import httpx
+from benchmarks.baseline import compare, load_results, median_rows, percentiles, save_results
+from benchmarks.synthetic import synthetic_queries, synthetic_snippets
+
+KEYS = ("endpoint", "corpus_size", "concurrency")
+ENDPOINTS = ("answer", "bm25", "vector", "hybrid", "batch")
+
+
+def request_for(endpoint: str, queries: List[str], i: int, top_k: int) -> tuple:
+    query = queries[i % len(queries)]
+    if endpoint == "answer":
+        return "/retriever/answer", {"query": query}
+    if endpoint == "batch":
+        batch = [queries[(i + j) % len(queries)] for j in range(8)]
+        return "/retriever/batch", {"queries": batch, "retriever_type": "hybrid", "top_k": top_k}
+    return f"/retriever/{endpoint}", {"query": query, "top_k": top_k}
+
+
+async def run_load(client: httpx.AsyncClient, endpoints: Sequence[str], queries: List[str], concurrency: int,
+                   duration_s: float, top_k: int = 3) -> Dict[str, Dict]:
+    """Closed-loop load for `duration_s`; returns per-endpoint {"latencies": [...ms], "errors": n}."""
+    stats = defaultdict(lambda: {"latencies": [], "errors": 0})
+    deadline = time.perf_counter() + duration_s
+    counter = iter(range(1 << 62))
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            i = next(counter)
+            endpoint = endpoints[i % len(endpoints)]
+            path, body = request_for(endpoint, queries, i // len(endpoints), top_k)
+            t0 = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                ok = response.status_code == 200 and "error" not in response.json()
+            except httpx.HTTPError:
+                ok = False
+            stats[endpoint]["latencies"].append((time.perf_counter() - t0) * 1000)
+            stats[endpoint]["errors"] += 0 if ok else 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return stats
+
+
+def summarize(stats: Dict[str, Dict], elapsed_s: float, corpus_size, concurrency: int) -> List[Dict]:
+    rows = []
+    every = [lt for s in stats.values() for lt in s["latencies"]]
+    for endpoint, s in [*stats.items(), ("all", {"latencies": every, "errors": sum(s["errors"] for s in stats.values())})]:
+        rows.append({
+            "endpoint": endpoint,
+            "corpus_size": corpus_size,
+            "concurrency": concurrency,
+            "requests": len(s["latencies"]),
+            "errors": s["errors"],
+            "rps": round(len(s["latencies"]) / elapsed_s, 1),
+            **percentiles(s["latencies"]),
+        })
+    return rows
+
+
+def in_process_client(corpus_size: int, dim: int, cache_size: int) -> httpx.AsyncClient:
+    """AsyncClient bound to the FastAPI app, serving `corpus_size` synthetic snippets with hash embeddings."""
+    os.environ.setdefault("EMBEDDING_BACKEND", "hash")
+    os.environ.setdefault("PROFILE_SAMPLE_RATE", "0")
+    from app import app
+    from data_retriever.embeddings import HashEmbeddings
+    from data_retriever.retriever import SimpleRetriever
+
+    app.state.simple_retriever = SimpleRetriever(
+        synthetic_snippets(corpus_size), HashEmbeddings(dim), cache_size=cache_size, eager=True
+    )
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running service (default: drive the app in-process)")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=ENDPOINTS)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load after warm-up")
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--repeats", type=int, default=3, help="load runs of --duration each; the median is reported")
+    parser.add_argument("--queries", type=int, default=1000, help="size of the synthetic query pool")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--corpus-size", type=int, default=1000, help="in-process only")
+    parser.add_argument("--dim", type=int, default=256, help="in-process only: hash embedding size")
+    parser.add_argument("--cache-size", type=int, default=0,
+                        help="in-process only: retriever cache size (0 measures the uncached hot path)")
+    parser.add_argument("--output", help="write the results as a JSON baseline to this path")
+    parser.add_argument("--baseline", help="compare against this baseline and exit 1 on regressions")
+    # end-to-end runs share the machine with the event loop, client and app, and drift more than the micro ones
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown as a fraction")
+    args = parser.parse_args()
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60, limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        client = in_process_client(args.corpus_size, args.dim, args.cache_size)
+    queries = synthetic_queries(args.queries)
+
+    async def run():
+        async with client:
+            await run_load(client, args.endpoints, queries, args.concurrency, args.warmup, args.top_k)
+            runs = []
+            for _ in range(args.repeats):
+                t0 = time.perf_counter()
+                stats = await run_load(client, args.endpoints, queries, args.concurrency, args.duration, args.top_k)
+                runs.append(summarize(stats, time.perf_counter() - t0, None if args.url else args.corpus_size,
+                                      args.concurrency))
+            return runs
+
+    rows = median_rows(asyncio.run(run()), KEYS)
+    for row in rows:
+        print(row)
+
+    if args.output:
+        save_results(args.output, "load", rows, {k: v for k, v in vars(args).items() if k not in ("output", "baseline")})
+    if args.baseline:
+        regressions = compare(rows, load_results(args.baseline)["results"], KEYS, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
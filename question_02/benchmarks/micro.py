@@ -0,0 +1,106 @@
+"""Micro-benchmarks of `SimpleRetriever.retrieve` on synthetic corpora, fully offline.
+
+Documents and queries are embedded with the deterministic `HashEmbeddings`
+and both retriever caches are disabled, so every call runs the whole hot path
+(normalize, embed, BM25 / FAISS search, fusion, response). Per
+(corpus size, retriever_type, metric, top_k) it reports single-query latency
+percentiles and throughput, plus `retrieve_many` throughput.
+
+Each configuration is measured `--repeats` times and the median is kept.
+
+    python -m benchmarks.micro --sizes 1000 100000 --output benchmarks/baselines/micro.json
+    python -m benchmarks.micro --sizes 1000 --baseline benchmarks/baselines/micro.json  # exit 1 on regression
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List, Sequence
+from benchmarks.baseline import compare, load_results, median_rows, percentiles, save_results
+from benchmarks.synthetic import synthetic_queries, synthetic_snippets
+from data_retriever.embeddings import HashEmbeddings
+from data_retriever.retriever import SimpleRetriever
+
+KEYS = ("size", "retriever_type", "metric", "top_k")
+
+
+def build_retriever(snippets: List[str], dim: int = 256, index_type: str = "flat", index_params: Dict = None):
+    return SimpleRetriever(
+        snippets, HashEmbeddings(dim), cache_size=0, batch_window_ms=0, index_type=index_type,
+        index_params=index_params, eager=True,
+    )
+
+
+def benchmark_retriever(retriever: SimpleRetriever, queries: List[str], retriever_types: Sequence[str],
+                        metrics: Sequence[str], top_ks: Sequence[int], warmup: int = 5) -> List[Dict]:
+    rows = []
+    for retriever_type in retriever_types:
+        # BM25 ignores the metric
+        for metric in (["-"] if retriever_type == "bm25" else metrics):
+            kwargs = {} if metric == "-" else {"metric": metric}
+            for top_k in top_ks:
+                for query in queries[:warmup]:
+                    retriever.retrieve(query, retriever_type, top_k, **kwargs)
+                latencies = []
+                for query in queries:
+                    t0 = time.perf_counter()
+                    retriever.retrieve(query, retriever_type, top_k, **kwargs)
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                t0 = time.perf_counter()
+                retriever.retrieve_many(queries, retriever_type, top_k, **kwargs)
+                batch_s = time.perf_counter() - t0
+                rows.append({
+                    "retriever_type": retriever_type,
+                    "metric": metric,
+                    "top_k": top_k,
+                    **percentiles(latencies),
+                    "qps": round(len(queries) / (sum(latencies) / 1000), 1),
+                    "batch_qps": round(len(queries) / batch_s, 1) if batch_s > 0 else None,
+                })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000], help="corpus sizes, e.g. 1000 100000 1000000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--retriever-types", nargs="+", default=["bm25", "faiss", "hybrid"])
+    parser.add_argument("--metrics", nargs="+", default=["cosine", "l2"])
+    parser.add_argument("--top-k", type=int, nargs="+", default=[3, 10])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--repeats", type=int, default=5, help="runs per configuration; the median is reported")
+    parser.add_argument("--index-type", default="flat", choices=["flat", "ivf_flat", "hnsw", "ivf_pq"])
+    parser.add_argument("--index-params", type=json.loads, default={}, help='JSON, e.g. \'{"nprobe": 16}\'')
+    parser.add_argument("--output", help="write the results as a JSON baseline to this path")
+    parser.add_argument("--baseline", help="compare against this baseline and exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown as a fraction")
+    args = parser.parse_args()
+
+    queries = synthetic_queries(args.queries)
+    rows = []
+    for size in args.sizes:
+        t0 = time.perf_counter()
+        retriever = build_retriever(synthetic_snippets(size), args.dim, args.index_type, args.index_params)
+        build_s = round(time.perf_counter() - t0, 3)
+        runs = [
+            benchmark_retriever(retriever, queries, args.retriever_types, args.metrics, args.top_k)
+            for _ in range(args.repeats)
+        ]
+        for row in median_rows(runs, KEYS[1:]):
+            row = {"size": size, **row, "build_s": build_s}
+            print(row)
+            rows.append(row)
+        retriever.executor.shutdown()
+
+    if args.output:
+        save_results(args.output, "micro", rows, {k: v for k, v in vars(args).items() if k not in ("output", "baseline")})
+    if args.baseline:
+        regressions = compare(rows, load_results(args.baseline)["results"], KEYS, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
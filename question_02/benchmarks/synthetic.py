@@ -0,0 +1,51 @@
+"""Deterministic synthetic corpora and queries shaped like the profile snippets in `database.simple_data`."""
+from typing import List
+import numpy as np
+
+FIRST_NAMES = ["Omar", "Mohamed", "Hossam", "Sara", "Youssef", "Nour", "Mona", "Ali", "Fatma", "Karim", "Salma",
+               "Ahmed", "Laila", "Dina", "Mariam", "Hana", "Tarek", "Yara", "Mostafa", "Reem"]
+LAST_NAMES = ["Khaled", "Samy", "Hassan", "Mahmoud", "Adel", "Ahmed", "Gamal", "Yasser", "Fathy", "Magdy",
+              "Sherif", "Mostafa", "Saleh", "Nabil", "Ibrahim", "Farouk"]
+ROLES = ["Backend Engineer", "Frontend Developer", "Data Scientist", "DevOps Engineer", "Cloud Engineer",
+         "Machine Learning Engineer", "QA Engineer", "Mobile Application Developer", "Database Administrator",
+         "Cybersecurity Specialist", "UI/UX Designer", "Project Manager", "Embedded Systems Engineer",
+         "Business Analyst", "Site Reliability Engineer", "Data Engineer"]
+SKILLS = ["Python", "Java", "Go", "Rust", "TypeScript", "React", "Next.js", "Node.js", "Django", "FastAPI",
+          "PostgreSQL", "MySQL", "MongoDB", "Redis", "Kafka", "Spark", "Airflow", "Docker", "Kubernetes",
+          "Terraform", "AWS", "Azure", "GCP", "Jenkins", "GitHub Actions", "TensorFlow", "PyTorch",
+          "Scikit-learn", "Pandas", "Flutter", "Kotlin", "Swift", "Figma", "Selenium", "SIEM", "Linux",
+          "GraphQL", "gRPC", "Elasticsearch", "Prometheus", "Grafana", "C/C++", "ARM microcontrollers"]
+TOPICS = ["microservices", "high-load systems", "CI/CD pipelines", "recommender systems", "anomaly detection",
+          "real-time analytics", "cloud migration", "penetration testing", "API design", "data pipelines",
+          "mobile performance", "infrastructure automation", "search relevance", "observability",
+          "incident response", "customer segmentation", "computer vision", "NLP applications"]
+
+
+def synthetic_snippets(n: int, seed: int = 0) -> List[str]:
+    """`n` distinct profile snippets (the index is embedded as an employee id, so no two are equal)."""
+    rng = np.random.default_rng(seed)
+    first = rng.integers(len(FIRST_NAMES), size=n)
+    last = rng.integers(len(LAST_NAMES), size=n)
+    role = rng.integers(len(ROLES), size=n)
+    years = rng.integers(1, 15, size=n)
+    skills = rng.integers(len(SKILLS), size=(n, 4))
+    topics = rng.integers(len(TOPICS), size=(n, 2))
+    return [
+        f"{FIRST_NAMES[first[i]]} {LAST_NAMES[last[i]]} (employee {i}) is a {ROLES[role[i]]} with {years[i]} years "
+        f"of experience. Skilled in {SKILLS[skills[i, 0]]}, {SKILLS[skills[i, 1]]}, {SKILLS[skills[i, 2]]} and "
+        f"{SKILLS[skills[i, 3]]}. Worked on {TOPICS[topics[i, 0]]} and {TOPICS[topics[i, 1]]}."
+        for i in range(n)
+    ]
+
+
+def synthetic_queries(n: int, seed: int = 1) -> List[str]:
+    """`n` short recruiter-style queries mixing roles, skills and topics."""
+    rng = np.random.default_rng(seed)
+    templates = [
+        lambda: f"{SKILLS[rng.integers(len(SKILLS))]} {ROLES[rng.integers(len(ROLES))]}",
+        lambda: f"{ROLES[rng.integers(len(ROLES))]} with {SKILLS[rng.integers(len(SKILLS))]} and "
+                f"{SKILLS[rng.integers(len(SKILLS))]}",
+        lambda: f"experience in {TOPICS[rng.integers(len(TOPICS))]} using {SKILLS[rng.integers(len(SKILLS))]}",
+        lambda: f"{FIRST_NAMES[rng.integers(len(FIRST_NAMES))]} {LAST_NAMES[rng.integers(len(LAST_NAMES))]}",
+    ]
+    return [templates[rng.integers(len(templates))]() for _ in range(n)]
@@ -0,0 +1,95 @@
+"""Recall@k vs latency of the approximate index types, measured against the exact flat index.
+
+Run on synthetic clustered vectors:
+    python -m data_retriever.ann_benchmark --n 100000 --dim 128 --queries 500
+or on the live corpus through `SimpleRetriever.benchmark_ann(queries)`.
+"""
+import argparse
+import json
+import time
+from typing import Dict, List, Tuple
+import faiss
+import numpy as np
+from data_retriever.dense_index import DenseIndex
+
+# (index_type, build kwargs, search kwargs to sweep)
+DEFAULT_CONFIGS: List[Tuple[str, Dict, List[Dict]]] = [
+    ("flat", {}, [{}]),
+    ("ivf_flat", {}, [{"nprobe": 1}, {"nprobe": 8}, {"nprobe": 32}]),
+    ("hnsw", {"hnsw_m": 32}, [{"ef_search": 16}, {"ef_search": 64}, {"ef_search": 256}]),
+    ("ivf_pq", {}, [{"nprobe": 8}, {"nprobe": 32}]),
+]
+
+
+def recall_at_k(approx_ids: np.ndarray, exact_ids: np.ndarray) -> float:
+    """Mean fraction of the exact top-k that the approximate search also returned."""
+    hits = [len(np.intersect1d(a[a >= 0], e[e >= 0])) / max(1, int((e >= 0).sum())) for a, e in zip(approx_ids, exact_ids)]
+    return float(np.mean(hits)) if hits else 0.0
+
+
+def benchmark_indexes(vectors: np.ndarray, queries: np.ndarray, metric: str = "cosine", k: int = 10,
+                      configs: List[Tuple[str, Dict, List[Dict]]] = DEFAULT_CONFIGS) -> List[Dict]:
+    """Build every configured index over `vectors` and report recall@k against flat search,
+    single-query latency percentiles and batched throughput for each search setting."""
+    exact, _ = DenseIndex.build(vectors, metric, "flat").search_many(queries, k)
+    rows = []
+    for index_type, build_kwargs, sweeps in configs:
+        t0 = time.perf_counter()
+        index = DenseIndex.build(vectors, metric, index_type, **build_kwargs)
+        build_s = time.perf_counter() - t0
+        for search_kwargs in sweeps:
+            latencies = []
+            for query in queries:
+                t0 = time.perf_counter()
+                index.search(query, k, **search_kwargs)
+                latencies.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            approx, _ = index.search_many(queries, k, **search_kwargs)
+            batch_s = time.perf_counter() - t0
+            rows.append({
+                "index_type": index_type,
+                **build_kwargs,
+                **search_kwargs,
+                f"recall@{k}": round(recall_at_k(approx, exact), 4),
+                "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+                "p95_ms": round(float(np.percentile(latencies, 95)), 4),
+                "batch_qps": round(len(queries) / batch_s, 1) if batch_s > 0 else None,
+                "build_s": round(build_s, 3),
+                "index_bytes": _index_bytes(index),
+            })
+    return rows
+
+
+def _index_bytes(index: DenseIndex) -> int:
+    return int(faiss.serialize_index(index.index).nbytes)
+
+
+def synthetic_vectors(n: int, dim: int, n_clusters: int = 100, seed: int = 0) -> np.ndarray:
+    """Gaussian clusters, closer to real embedding distributions than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size=n)
+    return centers[labels] + 0.3 * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--metric", default="cosine", choices=["cosine", "l2"])
+    parser.add_argument("--output", help="write the results as JSON to this path")
+    args = parser.parse_args()
+
+    data = synthetic_vectors(args.n + args.queries, args.dim)
+    rows = benchmark_indexes(data[:args.n], data[args.n:], args.metric, args.k)
+    for row in rows:
+        print(row)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
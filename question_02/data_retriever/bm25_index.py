@@ -0,0 +1,298 @@
+import json
+import os
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+def default_tokenizer(text: str) -> List[str]:
+    # Same whitespace split langchain's BM25Retriever uses, so rankings carry over unchanged.
+    return text.split()
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index held in NumPy arrays.
+
+    Postings are stored CSR-style: the documents containing term `t` are
+    `indices[indptr[t]:indptr[t + 1]]` with term frequencies in `tf`. Scoring
+    only gathers the postings of the query terms, accumulates them per
+    document and takes the top-k with `argpartition`, so the cost depends on
+    how many documents match rather than on corpus size. Scores follow
+    `rank_bm25.BM25Okapi` (same k1/b/epsilon and IDF floor). The index holds
+    no per-request state; `k` is passed on every call.
+    """
+
+    def __init__(self, vocab: Dict[str, int], indptr: np.ndarray, indices: np.ndarray, tf: np.ndarray,
+                 doc_len: np.ndarray, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25,
+                 tokenizer: Callable[[str], List[str]] = default_tokenizer):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.indices = indices
+        self.tf = tf
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.tokenizer = tokenizer
+        self._precompute()
+
+    @classmethod
+    def build(cls, texts: Iterable[str], tokenizer: Callable[[str], List[str]] = default_tokenizer, **params) -> "BM25Index":
+        vocab: Dict[str, int] = {}
+        term_ids, doc_ids, freqs, doc_len = [], [], [], []
+        for doc_id, text in enumerate(texts):
+            tokens = tokenizer(text)
+            doc_len.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(doc_id)
+                freqs.append(count)
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(term_ids, kind="stable")
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=indptr[1:])
+        return cls(
+            vocab,
+            indptr,
+            np.asarray(doc_ids, dtype=np.int64)[order],
+            np.asarray(freqs, dtype=np.float32)[order],
+            np.asarray(doc_len, dtype=np.float32),
+            tokenizer=tokenizer,
+            **params,
+        )
+
+    def _precompute(self):
+        n_docs = len(self.doc_len)
+        avgdl = float(self.doc_len.mean()) if n_docs else 0.0
+        df = np.diff(self.indptr).astype(np.float64)
+        idf = np.log(n_docs - df + 0.5) - np.log(df + 0.5)
+        # rank_bm25 floors negative IDFs (terms in more than half the docs) at epsilon * mean IDF
+        average_idf = idf.mean() if len(idf) else 0.0
+        idf[idf < 0] = self.epsilon * average_idf
+        self.idf = idf.astype(np.float32)
+        # Per-document length norm k1 * (1 - b + b * dl / avgdl), precomputed once.
+        self.norm = (self.k1 * (1 - self.b + self.b * self.doc_len / avgdl)).astype(np.float32) if avgdl else \
+            np.full(n_docs, self.k1, dtype=np.float32)
+
+    @property
+    def size(self) -> int:
+        return len(self.doc_len)
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (ids, scores) of the top-k documents for `query`."""
+        ids, scores = self.search_many([query], k)
+        return ids[0], scores[0]
+
+    def search_many(self, queries: List[str], k: int) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """Top-k (ids, scores) for each query.
+
+        Queries are scored one at a time, so memory stays bounded by one
+        query's postings plus the corpus size however large the batch is.
+        Documents that match no query term score 0 and only fill the result
+        (lowest ids first) when fewer than k documents match, as rank_bm25's
+        top-n would.
+        """
+        k = min(k, self.size)
+        if k <= 0:
+            return [np.empty(0, dtype=np.int64) for _ in queries], [np.empty(0, dtype=np.float32) for _ in queries]
+        candidates = np.arange(self.size)
+        results = [_top_k(*self._postings(query, self.idf, self.norm), self.size, k, candidates) for query in queries]
+        return [ids for ids, _ in results], [scores for _, scores in results]
+
+    def _postings(self, query: str, idf: np.ndarray, norm: np.ndarray,
+                  row_offset: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """(row, BM25 weight) of every posting of every term of `query`.
+
+        `idf` is indexed by this index's term ids and `norm` by row; rows are
+        local ids shifted by `row_offset`.
+        """
+        term_ids = [tid for tid in map(self.vocab.get, self.tokenizer(query)) if tid is not None]
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+
+        # Gather the postings of every query term without a Python loop over them.
+        starts = self.indptr[term_ids]
+        lengths = self.indptr[term_ids + 1] - starts
+        total = int(lengths.sum())
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        rows = self.indices[offsets] + row_offset
+        tf = self.tf[offsets]
+        weights = np.repeat(idf[term_ids], lengths) * (tf * (self.k1 + 1)) / (tf + norm[rows])
+        return rows, weights
+
+    def save(self, path: str):
+        """Write the index as a directory of .npy files that `load` can memory-map."""
+        os.makedirs(path, exist_ok=True)
+        terms = np.empty(len(self.vocab), dtype=object)
+        for term, tid in self.vocab.items():
+            terms[tid] = term
+        np.save(os.path.join(path, "terms.npy"), terms.astype(str))
+        for name in ("indptr", "indices", "tf", "doc_len"):
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, "params.json"), "w") as f:
+            json.dump({"k1": self.k1, "b": self.b, "epsilon": self.epsilon}, f)
+
+    @classmethod
+    def load(cls, path: str, tokenizer: Callable[[str], List[str]] = default_tokenizer) -> "BM25Index":
+        with open(os.path.join(path, "params.json")) as f:
+            params = json.load(f)
+        terms = np.load(os.path.join(path, "terms.npy"))
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in ("indptr", "indices", "tf", "doc_len")
+        }
+        return cls({str(term): tid for tid, term in enumerate(terms)}, tokenizer=tokenizer, **arrays, **params)
+
+
+def _accumulate(rows: np.ndarray, weights: np.ndarray, n_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct matched rows and their summed posting weights.
+
+    Few postings are sorted and summed directly; many are summed in one dense
+    O(n_rows) pass instead, which beats sorting them.
+    """
+    if len(rows) * 8 < n_rows:
+        docs, inverse = np.unique(rows, return_inverse=True)
+        return docs, np.bincount(inverse, weights=weights).astype(np.float32)
+    totals = np.bincount(rows, weights=weights, minlength=n_rows)
+    matched = np.zeros(n_rows, dtype=bool)
+    matched[rows] = True
+    docs = np.flatnonzero(matched)
+    return docs, totals[docs].astype(np.float32)
+
+
+def _top_k(rows: np.ndarray, weights: np.ndarray, n_rows: int, k: int,
+           candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum one query's posting weights per row and keep the top-k rows.
+
+    With fewer than k matches the result is topped up with zero-score rows
+    from `candidates` (lowest first).
+    """
+    docs, doc_scores = _accumulate(rows, weights, n_rows)
+    if len(docs) > k:
+        top = np.argpartition(-doc_scores, k - 1)[:k]
+        docs, doc_scores = docs[top], doc_scores[top]
+    order = np.lexsort((docs, -doc_scores))
+    docs, doc_scores = docs[order], doc_scores[order]
+    if len(docs) < k:
+        filler = np.setdiff1d(candidates[:k + len(docs)], docs)[:k - len(docs)]
+        docs = np.concatenate([docs, filler])
+        doc_scores = np.concatenate([doc_scores, np.zeros(len(filler), dtype=np.float32)])
+    return docs, doc_scores
+
+
+class LiveBM25Index:
+    """A BM25Index that accepts adds and deletes without rebuilding, copy-on-write.
+
+    Rows are stable until the next compaction: the immutable `base` covers rows
+    [0, base.size) and a small `delta` index the rows appended since, with
+    deleted delta rows indexed as empty documents. Deleting a base row only
+    tombstones it and subtracts its terms from the document frequencies, so
+    an update costs O(delta) and leaves the base arrays (possibly
+    memory-mapped) untouched. IDF and length norms are recomputed over the
+    live documents, so scores equal a fresh BM25Index over them. `updated`
+    and `compacted` return new instances; readers holding the old one are
+    unaffected.
+    """
+
+    def __init__(self, base: BM25Index, delta_texts: Sequence[str] = (), deleted: Optional[np.ndarray] = None,
+                 removed_df: Optional[np.ndarray] = None, tombstones: int = 0):
+        self.base = base
+        self.delta_texts = list(delta_texts)
+        self.delta = BM25Index.build(self.delta_texts, base.tokenizer, k1=base.k1, b=base.b, epsilon=base.epsilon)
+        n_rows = base.size + len(self.delta_texts)
+        self.deleted = deleted if deleted is not None else np.zeros(n_rows, dtype=bool)
+        # Per base term, how many deleted base documents contained it.
+        self.removed_df = removed_df if removed_df is not None else np.zeros(len(base.vocab), dtype=np.int64)
+        self.tombstones = tombstones  # base rows deleted since the base was built
+        self._precompute()
+
+    def _precompute(self):
+        base, delta = self.base, self.delta
+        live = ~self.deleted
+        self.live_rows = np.flatnonzero(live)
+        n_docs = len(self.live_rows)
+        doc_len = np.concatenate([base.doc_len, delta.doc_len]) * live
+        avgdl = float(doc_len.sum() / n_docs) if n_docs else 0.0
+        self.norm = (base.k1 * (1 - base.b + base.b * doc_len / avgdl)).astype(np.float32) if avgdl else \
+            np.full(len(doc_len), base.k1, dtype=np.float32)
+
+        base_df = np.diff(base.indptr) - self.removed_df
+        delta_df = np.diff(delta.indptr)
+        shared = [(base.vocab[term], tid) for term, tid in delta.vocab.items() if term in base.vocab]
+        shared_base = np.asarray([b for b, _ in shared], dtype=np.int64)
+        shared_delta = np.asarray([d for _, d in shared], dtype=np.int64)
+        base_df[shared_base] += delta_df[shared_delta]
+        delta_df[shared_delta] = base_df[shared_base]
+        delta_only = np.ones(len(delta_df), dtype=bool)
+        delta_only[shared_delta] = False
+
+        base_idf = np.log(n_docs - base_df + 0.5) - np.log(base_df + 0.5)
+        delta_idf = np.log(n_docs - delta_df + 0.5) - np.log(delta_df + 0.5)
+        # The vocabulary a rebuild would see: every term still in some live document, counted once.
+        vocab_idf = np.concatenate([base_idf[base_df > 0], delta_idf[delta_only & (delta_df > 0)]])
+        average_idf = vocab_idf.mean() if len(vocab_idf) else 0.0
+        base_idf[base_idf < 0] = base.epsilon * average_idf
+        delta_idf[delta_idf < 0] = base.epsilon * average_idf
+        self.base_idf = base_idf.astype(np.float32)
+        self.delta_idf = delta_idf.astype(np.float32)
+
+    @property
+    def size(self) -> int:
+        return len(self.live_rows)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.deleted)
+
+    @property
+    def pending(self) -> int:
+        """Delta rows plus deleted base rows: the work a compaction would fold in."""
+        return len(self.delta_texts) + self.tombstones
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        ids, scores = self.search_many([query], k)
+        return ids[0], scores[0]
+
+    def search_many(self, queries: List[str], k: int) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """Same contract as `BM25Index.search_many`; ids are global rows."""
+        k = min(k, self.size)
+        if k <= 0:
+            return [np.empty(0, dtype=np.int64) for _ in queries], [np.empty(0, dtype=np.float32) for _ in queries]
+        all_ids, all_scores = [], []
+        for query in queries:
+            rows, weights = self.base._postings(query, self.base_idf, self.norm)
+            keep = ~self.deleted[rows]
+            delta_rows, delta_weights = self.delta._postings(query, self.delta_idf, self.norm, self.base.size)
+            ids, scores = _top_k(
+                np.concatenate([rows[keep], delta_rows]), np.concatenate([weights[keep], delta_weights]),
+                self.n_rows, k, self.live_rows,
+            )
+            all_ids.append(ids)
+            all_scores.append(scores)
+        return all_ids, all_scores
+
+    def updated(self, removed_rows: Sequence[int] = (), removed_texts: Sequence[str] = (),
+                added_texts: Sequence[str] = ()) -> "LiveBM25Index":
+        """New index with `removed_rows` (whose texts are `removed_texts`) deleted and
+        `added_texts` appended as rows n_rows, n_rows + 1, ..."""
+        deleted = np.concatenate([self.deleted, np.zeros(len(added_texts), dtype=bool)])
+        delta_texts = list(self.delta_texts)
+        removed_df = self.removed_df.copy()
+        tombstones = self.tombstones
+        for row, text in zip(removed_rows, removed_texts):
+            if deleted[row]:
+                continue
+            deleted[row] = True
+            if row >= self.base.size:
+                delta_texts[row - self.base.size] = ""
+                continue
+            tombstones += 1
+            for term in set(self.base.tokenizer(text)):
+                tid = self.base.vocab.get(term)
+                if tid is not None:
+                    removed_df[tid] += 1
+        return LiveBM25Index(self.base, delta_texts + list(added_texts), deleted, removed_df, tombstones)
+
+    def compacted(self, texts: Iterable[str]) -> "LiveBM25Index":
+        """Fold the delta and tombstones into a new base over `texts`, the live documents renumbered from row 0."""
+        base = self.base
+        return LiveBM25Index(BM25Index.build(texts, base.tokenizer, k1=base.k1, b=base.b, epsilon=base.epsilon))
@@ -0,0 +1,284 @@
+"""Streaming bulk ingestion of a JSONL or Parquet corpus into an on-disk doc store and a FAISS index.
+
+    python -m data_retriever.bulk_loader corpus.jsonl --out data/corpus --backend local --index-type ivf_pq
+
+Records are read in batches and embedded on a bounded thread pool; each
+embedded batch is appended, in input order, to the doc store
+(`docs/`), the raw vector file (`vectors.f32`) and the index. Memory stays
+bounded by the in-flight batches (plus the IVF training sample and the
+index itself), not by the corpus. `checkpoint.json` records how far every
+source has been committed, so an interrupted run resumes where it stopped:
+the index is replayed from `vectors.f32` and nothing is re-embedded.
+Serve the result with `SimpleRetriever.from_bulk(out_dir)`.
+"""
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from data_retriever.dense_index import DenseIndex, INDEX_TYPES
+from data_retriever.doc_store import DocStoreWriter
+from data_retriever.embedding_store import embedding_model_name
+from data_retriever.embeddings import EMBEDDING_BACKENDS, build_embedding_model, embed_array
+
+VECTORS_FILE = "vectors.f32"
+INDEX_FILE = "dense.index"
+CHECKPOINT_FILE = "checkpoint.json"
+MANIFEST_FILE = "manifest.json"
+
+
+Batch = Tuple[List[str], Dict[str, List], int]
+
+
+def read_jsonl(path: str, text_field: str, batch_size: int, position: int = 0,
+               fields: Sequence[str] = ()) -> Iterator[Batch]:
+    """Yield (texts, {field: values}, position after them) batches; the position is a byte offset."""
+    with open(path, "rb") as f:
+        f.seek(position)
+        records = []
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            if line.strip():
+                records.append(json.loads(line))
+            if len(records) == batch_size:
+                yield [r[text_field] for r in records], {n: [r.get(n) for r in records] for n in fields}, f.tell()
+                records = []
+        if records:
+            yield [r[text_field] for r in records], {n: [r.get(n) for r in records] for n in fields}, f.tell()
+
+
+def read_parquet(path: str, text_field: str, batch_size: int, position: int = 0,
+                 fields: Sequence[str] = ()) -> Iterator[Batch]:
+    """Yield (texts, {field: values}, position after them) batches; the position is a row number."""
+    import pyarrow.parquet as pq  # optional dependency, only needed for Parquet input
+
+    row = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=[text_field, *fields]):
+        if row + batch.num_rows <= position:
+            row += batch.num_rows
+            continue
+        skip = max(0, position - row)
+        row += batch.num_rows
+        columns = {name: batch.column(i).to_pylist()[skip:] for i, name in enumerate([text_field, *fields])}
+        yield columns.pop(text_field), columns, row
+
+
+READERS = {".jsonl": read_jsonl, ".json": read_jsonl, ".parquet": read_parquet}
+
+
+def _write_json(path: str, data: Dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class BulkLoader:
+    """Streams sources into `out_dir`; see the module docstring for the layout and resume semantics.
+
+    Args:
+        out_dir: output directory, created if missing and resumed if it holds a checkpoint
+        embedding_model: langchain embeddings (in-process models are called through `encode`)
+        metadata_fields: record fields to keep as doc store columns, name -> "str" | "int64" | "float64"
+        metric / index_type / index_params: as for `SimpleRetriever`; for IVF types without an
+            explicit nlist, pass `expected_docs` so nlist fits the corpus rather than the sample
+        batch_size: records per embedding call
+        max_workers: embedding calls running at once; at most 2x this many batches are in flight
+        train_size: vectors buffered to train IVF indexes before anything is added
+        checkpoint_every: documents between checkpoints
+        progress: called with the running stats every `report_every` seconds and at the end
+    """
+
+    def __init__(self, out_dir: str, embedding_model: Embeddings, metric: str = "cosine", index_type: str = "flat",
+                 index_params: Optional[Dict] = None, batch_size: int = 256, max_workers: int = 4,
+                 train_size: int = 100_000, checkpoint_every: int = 50_000, expected_docs: Optional[int] = None,
+                 report_every: float = 5.0, progress: Optional[Callable[[Dict], None]] = None,
+                 metadata_fields: Optional[Dict[str, str]] = None):
+        self.out_dir = out_dir
+        self.embedding_model = embedding_model
+        self.metric = metric
+        self.index_type = index_type
+        self.index_params = dict(index_params or {})
+        if expected_docs and index_type in ("ivf_flat", "ivf_pq") and "nlist" not in self.index_params:
+            self.index_params["nlist"] = int(4 * np.sqrt(expected_docs))
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.train_size = train_size
+        self.checkpoint_every = checkpoint_every
+        self.report_every = report_every
+        self.progress = progress
+        os.makedirs(out_dir, exist_ok=True)
+
+        self.checkpoint = {"docs": 0, "dim": None, "sources": {}}
+        checkpoint_path = os.path.join(out_dir, CHECKPOINT_FILE)
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                self.checkpoint = json.load(f)
+        self.docs = DocStoreWriter(os.path.join(out_dir, "docs"), self.checkpoint["docs"], metadata_fields)
+        self.dim = self.checkpoint["dim"]
+        self.index: Optional[DenseIndex] = None
+        self._train_buffer: List[np.ndarray] = []
+        self._vectors = open(os.path.join(out_dir, VECTORS_FILE), "ab", buffering=0)
+        self._vectors.truncate(self.checkpoint["docs"] * (self.dim or 0) * 4)
+        self._replay()
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        return embed_array(self.embedding_model, texts)
+
+    def _replay(self):
+        """Rebuild the in-memory index from the vectors already committed, without re-embedding."""
+        n = self.checkpoint["docs"]
+        if not n:
+            return
+        vectors = np.memmap(os.path.join(self.out_dir, VECTORS_FILE), dtype=np.float32, mode="r", shape=(n, self.dim))
+        for start in range(0, n, self.train_size):
+            self._add_vectors(np.asarray(vectors[start:start + self.train_size]))
+
+    def _add_vectors(self, vectors: np.ndarray):
+        if self.index is None and self.index_type not in ("ivf_flat", "ivf_pq"):
+            self.index = DenseIndex.create(vectors.shape[1], self.metric, self.index_type, **self.index_params)
+        if self.index is not None:
+            self.index.add(vectors)
+            return
+        # IVF: hold back the first `train_size` vectors, train on them, then add them.
+        self._train_buffer.append(vectors)
+        if sum(len(v) for v in self._train_buffer) >= self.train_size:
+            self._train()
+
+    def _train(self):
+        sample = np.concatenate(self._train_buffer)
+        self._train_buffer = []
+        self.index = DenseIndex.create(sample.shape[1], self.metric, self.index_type, len(sample), **self.index_params)
+        self.index.train(sample)
+        self.index.add(sample)
+
+    def _commit(self, texts: List[str], metadata: Dict[str, List], vectors: np.ndarray):
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+        self.docs.append(texts, metadata)
+        self._vectors.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        self._add_vectors(vectors)
+
+    def _save_checkpoint(self, source: str, position: int, done: bool = False):
+        self.docs.flush()
+        os.fsync(self._vectors.fileno())
+        self.checkpoint["docs"] = self.docs.count
+        self.checkpoint["dim"] = self.dim
+        self.checkpoint["sources"][source] = {"position": position, "done": done}
+        _write_json(os.path.join(self.out_dir, CHECKPOINT_FILE), self.checkpoint)
+
+    def load(self, path: str, text_field: str = "text") -> Dict:
+        """Ingest one source (resuming it if a previous run stopped part way) and return run stats."""
+        reader = READERS.get(os.path.splitext(path)[1].lower())
+        if reader is None:
+            raise ValueError(f"unsupported corpus format: {path} (expected one of {sorted(READERS)})")
+        source = os.path.abspath(path)
+        state = self.checkpoint["sources"].get(source, {"position": 0, "done": False})
+        stats = {"source": source, "docs": self.docs.count, "new_docs": 0, "elapsed_s": 0.0, "docs_per_s": 0.0}
+        if state["done"]:
+            return stats
+
+        t0 = last_report = time.perf_counter()
+        last_checkpoint = self.docs.count
+        position = state["position"]
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bulk-embed") as pool:
+            batches = reader(path, text_field, self.batch_size, position, list(self.docs.columns))
+            while True:
+                # Keep up to 2 * max_workers batches embedding; commit the oldest in input order.
+                for texts, metadata, next_position in batches:
+                    in_flight.append((texts, metadata, next_position, pool.submit(self._embed, texts)))
+                    if len(in_flight) >= 2 * self.max_workers:
+                        break
+                if not in_flight:
+                    break
+                texts, metadata, position, future = in_flight.popleft()
+                self._commit(texts, metadata, future.result())
+                stats["new_docs"] += len(texts)
+                if self.docs.count - last_checkpoint >= self.checkpoint_every:
+                    self._save_checkpoint(source, position)
+                    last_checkpoint = self.docs.count
+                now = time.perf_counter()
+                if self.progress and now - last_report >= self.report_every:
+                    self.progress(self._stats(stats, now - t0))
+                    last_report = now
+
+        self._save_checkpoint(source, position, done=True)
+        stats = self._stats(stats, time.perf_counter() - t0)
+        if self.progress:
+            self.progress(stats)
+        return stats
+
+    def _stats(self, stats: Dict, elapsed: float) -> Dict:
+        stats.update(
+            docs=self.docs.count,
+            elapsed_s=round(elapsed, 2),
+            docs_per_s=round(stats["new_docs"] / elapsed, 1) if elapsed > 0 else 0.0,
+        )
+        return dict(stats)
+
+    def finish(self) -> Dict:
+        """Train any IVF index still waiting for its sample, write the index and the manifest."""
+        if self._train_buffer:
+            self._train()
+        if self.index is not None:
+            tmp_path = os.path.join(self.out_dir, f"{INDEX_FILE}.tmp")
+            self.index.save(tmp_path)
+            os.replace(tmp_path, os.path.join(self.out_dir, INDEX_FILE))
+        self.docs.close()
+        self._vectors.close()
+        manifest = {
+            "docs": self.checkpoint["docs"],
+            "dim": self.dim,
+            "metric": self.metric,
+            "index_type": self.index_type,
+            "index_params": self.index_params,
+            "embedding_model": embedding_model_name(self.embedding_model),
+            "metadata": self.docs.columns,
+            "sources": sorted(self.checkpoint["sources"]),
+        }
+        _write_json(os.path.join(self.out_dir, MANIFEST_FILE), manifest)
+        return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help=".jsonl or .parquet files")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--metadata", nargs="*", default=[], metavar="FIELD[:TYPE]",
+                        help="record fields to store as columns, TYPE is str (default), int64 or float64")
+    parser.add_argument("--backend", default="openai", choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--model", help="model name for the embedding backend")
+    parser.add_argument("--metric", default="cosine", choices=["cosine", "l2"])
+    parser.add_argument("--index-type", default="flat", choices=INDEX_TYPES)
+    parser.add_argument("--index-params", default="{}", help='JSON, e.g. \'{"nlist": 4096, "pq_m": 48}\'')
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--train-size", type=int, default=100_000)
+    parser.add_argument("--checkpoint-every", type=int, default=50_000)
+    parser.add_argument("--expected-docs", type=int)
+    args = parser.parse_args()
+
+    model_kwargs = {}
+    if args.model:
+        model_kwargs["model_name" if args.backend == "local" else "model"] = args.model
+    loader = BulkLoader(
+        args.out, build_embedding_model(args.backend, **model_kwargs), args.metric, args.index_type,
+        json.loads(args.index_params), args.batch_size, args.workers, args.train_size, args.checkpoint_every,
+        args.expected_docs, progress=print,
+        metadata_fields=dict((field.split(":", 1) + ["str"])[:2] for field in args.metadata),
+    )
+    for source in args.sources:
+        loader.load(source, args.text_field)
+    print(loader.finish())
+
+
+if __name__ == "__main__":
+    main()
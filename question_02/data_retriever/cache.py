@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from data_retriever.metrics import CACHE_EVENTS
+
+_MISSING = object()
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace so trivially different spellings of a query share cache entries."""
+    return " ".join(query.split())
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+
+    Hits, misses, evictions (size) and expirations (ttl) are counted in
+    `retriever_cache_events_total{cache=<name>}`. A `maxsize` of 0 disables the cache.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: Optional[float] = 300.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hit = CACHE_EVENTS.labels(cache=name, event="hit")
+        self._miss = CACHE_EVENTS.labels(cache=name, event="miss")
+        self._evict = CACHE_EVENTS.labels(cache=name, event="eviction")
+        self._expire = CACHE_EVENTS.labels(cache=name, event="expiration")
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if self.maxsize <= 0:
+            return default
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self._miss.inc()
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self._expire.inc()
+                self._miss.inc()
+                return default
+            self._data.move_to_end(key)
+            self._hit.inc()
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evict.inc()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,242 @@
+import math
+from typing import Optional, Sequence, Tuple
+import faiss
+import numpy as np
+
+METRICS = ("cosine", "l2")
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row, leaving all-zero rows untouched."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _largest_divisor(n: int, at_most: int) -> int:
+    for m in range(max(1, min(n, at_most)), 0, -1):
+        if n % m == 0:
+            return m
+    return 1
+
+
+class DenseIndex:
+    """A FAISS index built once over the corpus vectors for a single metric.
+
+    For "cosine" the vectors are L2-normalized and searched by inner product,
+    so scores are cosine similarities. Any other metric searches the raw
+    vectors by L2 distance (same ranking the old per-request store gave).
+
+    `index_type` picks the structure: "flat" (exact), "ivf_flat", "hnsw" or
+    "ivf_pq" (compressed codes, for large corpora). IVF indexes probe
+    `nprobe` lists per query (default sqrt(nlist)) and HNSW explores
+    `ef_search` candidates; both defaults can be overridden per search.
+    Indexes created `id_mapped` store caller-supplied ids (flat and HNSW are
+    wrapped in an IndexIDMap2; IVF stores ids natively).
+    """
+
+    def __init__(self, index: faiss.Index, metric: str, index_type: str = "flat",
+                 nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        self.index = index
+        self.metric = metric
+        self.index_type = index_type
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+
+    @classmethod
+    def create(cls, dim: int, metric: str, index_type: str = "flat", n_train: int = 0, nlist: Optional[int] = None,
+               hnsw_m: int = 32, ef_construction: int = 200, pq_m: Optional[int] = None, pq_nbits: int = 8,
+               nprobe: Optional[int] = None, ef_search: Optional[int] = None, id_mapped: bool = False) -> "DenseIndex":
+        """An empty index; IVF types must be `train`ed (on `n_train` vectors) before `add`."""
+        faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == "cosine" else faiss.METRIC_L2
+        if index_type == "flat":
+            index = faiss.IndexFlatIP(dim) if metric == "cosine" else faiss.IndexFlatL2(dim)
+        elif index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss_metric)
+            index.hnsw.efConstruction = ef_construction
+        elif index_type in ("ivf_flat", "ivf_pq"):
+            # Rule of thumb nlist ~ 4 * sqrt(n), never more lists than training points.
+            nlist = max(1, min(nlist or int(4 * math.sqrt(n_train)), n_train))
+            quantizer = faiss.IndexFlatIP(dim) if metric == "cosine" else faiss.IndexFlatL2(dim)
+            if index_type == "ivf_flat":
+                index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss_metric)
+            else:
+                m = _largest_divisor(dim, pq_m or max(1, dim // 8))
+                nbits = max(1, min(pq_nbits, int(math.log2(max(n_train, 2)))))  # needs >= 2**nbits training points
+                index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, nbits, faiss_metric)
+        else:
+            raise ValueError(f"index_type must be one of {INDEX_TYPES}")
+        if id_mapped and index_type in ("flat", "hnsw"):
+            index = faiss.IndexIDMap2(index)
+        return cls(index, metric, index_type, nprobe, ef_search)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, metric: str, index_type: str = "flat", ids: Optional[np.ndarray] = None,
+              **params) -> "DenseIndex":
+        """Create, train and fill an index over `vectors` (see `create` for `params`).
+
+        With `ids` the vectors are added under those ids instead of their positions.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        dense = cls.create(vectors.shape[1], metric, index_type, len(vectors), id_mapped=ids is not None, **params)
+        dense.train(vectors)
+        dense.add(vectors, ids)
+        return dense
+
+    @property
+    def is_trained(self) -> bool:
+        return self.index.is_trained
+
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        return normalize_rows(vectors) if self.metric == "cosine" else vectors
+
+    def train(self, vectors: np.ndarray):
+        if not self.index.is_trained:
+            self.index.train(self._prepare(vectors))
+
+    def add(self, vectors: np.ndarray, ids: Optional[np.ndarray] = None):
+        if ids is None:
+            self.index.add(self._prepare(vectors))
+        else:
+            self.index.add_with_ids(self._prepare(vectors), np.ascontiguousarray(ids, dtype=np.int64))
+
+    def save(self, path: str):
+        faiss.write_index(self.index, path)
+
+    @classmethod
+    def load(cls, path: str, metric: str, index_type: str = "flat",
+             nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> "DenseIndex":
+        """Load a snapshot written by `save`, memory-mapped so workers share its pages.
+
+        IO_FLAG_MMAP_IFC maps flat codes and IVF lists alike (plain IO_FLAG_MMAP
+        copies IndexFlat codes into private memory); HNSW keeps its graph private.
+        """
+        index = faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+        return cls(index, metric, index_type, nprobe, ef_search)
+
+    @property
+    def size(self) -> int:
+        return self.index.ntotal
+
+    def search(self, query: np.ndarray, k: int, nprobe: Optional[int] = None,
+               ef_search: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (ids, scores) of the top-k documents for a single query vector."""
+        ids, scores = self.search_many(np.asarray(query, dtype=np.float32).reshape(1, -1), k, nprobe, ef_search)
+        keep = ids[0] >= 0
+        return ids[0][keep], scores[0][keep]
+
+    def search_many(self, queries: np.ndarray, k: int, nprobe: Optional[int] = None,
+                    ef_search: Optional[int] = None, exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Search a (n_queries, dim) matrix in one FAISS call; missing hits are padded with id -1.
+
+        Ids in `exclude` are skipped during the search itself (an IDSelector), not filtered afterwards.
+        """
+        n = len(queries)
+        if k <= 0 or self.size == 0:
+            return np.empty((n, 0), dtype=np.int64), np.empty((n, 0), dtype=np.float32)
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        if self.metric == "cosine":
+            queries = normalize_rows(queries)
+        # Keep the selectors referenced until the search returns; the params object doesn't own them.
+        excluded = faiss.IDSelectorBatch(np.ascontiguousarray(exclude, dtype=np.int64)) if exclude is not None and len(exclude) else None
+        selector = faiss.IDSelectorNot(excluded) if excluded is not None else None
+        params = self._search_params(nprobe or self.nprobe, ef_search or self.ef_search, selector)
+        scores, ids = self.index.search(queries, min(k, self.size), params=params)
+        return ids, scores
+
+    def _search_params(self, nprobe: Optional[int], ef_search: Optional[int], selector=None):
+        # Per-call parameter objects, so concurrent requests never race on shared index attributes.
+        if self.index_type in ("ivf_flat", "ivf_pq"):
+            nlist = faiss.extract_index_ivf(self.index).nlist
+            return faiss.SearchParametersIVF(nprobe=min(nprobe or max(1, int(math.sqrt(nlist))), nlist), sel=selector)
+        if self.index_type == "hnsw" and (ef_search or selector is not None):
+            return faiss.SearchParametersHNSW(efSearch=ef_search or 16, sel=selector)
+        if selector is not None:
+            return faiss.SearchParameters(sel=selector)
+        return None
+
+
+class LiveDenseIndex:
+    """A DenseIndex that accepts adds and deletes without touching the FAISS index.
+
+    The FAISS `base` is never mutated, so concurrent searches need no lock.
+    Added vectors go to a small in-memory delta searched by brute force, and
+    deleted ids are excluded from the base search with an IDSelector.
+    `updated` returns a new instance (copy-on-write); once the delta grows,
+    the owner rebuilds the base from the live vectors (see
+    `SimpleRetriever`), which also drops the deleted vectors for good.
+    """
+
+    def __init__(self, base: DenseIndex, delta_ids: Optional[np.ndarray] = None,
+                 delta_vectors: Optional[np.ndarray] = None, deleted: Optional[np.ndarray] = None):
+        self.base = base
+        dim = base.index.d
+        self.delta_ids = delta_ids if delta_ids is not None else np.empty(0, dtype=np.int64)
+        self.delta_vectors = delta_vectors if delta_vectors is not None else np.empty((0, dim), dtype=np.float32)
+        self.deleted = deleted if deleted is not None else np.empty(0, dtype=np.int64)
+        self._delta_sq_norms = np.einsum("ij,ij->i", self.delta_vectors, self.delta_vectors)
+
+    @property
+    def metric(self) -> str:
+        return self.base.metric
+
+    @property
+    def size(self) -> int:
+        return self.base.size - len(self.deleted) + len(self.delta_ids)
+
+    @property
+    def pending(self) -> int:
+        return len(self.delta_ids) + len(self.deleted)
+
+    def updated(self, removed_ids: Sequence[int] = (), added_ids: Sequence[int] = (),
+                added_vectors: Optional[np.ndarray] = None) -> "LiveDenseIndex":
+        removed_ids = np.asarray(removed_ids, dtype=np.int64)
+        in_delta = np.isin(self.delta_ids, removed_ids)
+        # Removed ids that aren't in the delta live in the base and become tombstones.
+        tombstones = np.setdiff1d(removed_ids, self.delta_ids[in_delta])
+        delta_ids, delta_vectors = self.delta_ids[~in_delta], self.delta_vectors[~in_delta]
+        if len(added_ids):
+            added_vectors = np.asarray(added_vectors, dtype=np.float32)
+            if self.metric == "cosine":
+                added_vectors = normalize_rows(added_vectors)
+            delta_ids = np.concatenate([delta_ids, np.asarray(added_ids, dtype=np.int64)])
+            delta_vectors = np.concatenate([delta_vectors, added_vectors])
+        return LiveDenseIndex(self.base, delta_ids, delta_vectors, np.union1d(self.deleted, tombstones))
+
+    def search(self, query: np.ndarray, k: int, nprobe: Optional[int] = None,
+               ef_search: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        ids, scores = self.search_many(np.asarray(query, dtype=np.float32).reshape(1, -1), k, nprobe, ef_search)
+        keep = ids[0] >= 0
+        return ids[0][keep], scores[0][keep]
+
+    def search_many(self, queries: np.ndarray, k: int, nprobe: Optional[int] = None,
+                    ef_search: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Same contract as `DenseIndex.search_many`, over base and delta merged."""
+        ids, scores = self.base.search_many(queries, k, nprobe, ef_search, exclude=self.deleted)
+        if k <= 0 or len(self.delta_ids) == 0:
+            return ids, scores
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        if self.metric == "cosine":
+            delta_scores = normalize_rows(queries) @ self.delta_vectors.T
+            delta_rank = -delta_scores
+        else:
+            # squared L2 as FAISS reports it, expanded to |q|^2 - 2 q.d + |d|^2 so it's a single matmul
+            # instead of an (n_queries, n_delta, dim) difference tensor
+            delta_scores = np.einsum("ij,ij->i", queries, queries)[:, None] - 2 * (queries @ self.delta_vectors.T)
+            delta_scores += self._delta_sq_norms
+            np.maximum(delta_scores, 0, out=delta_scores)
+            delta_rank = delta_scores
+        # Only the delta's own top-k can make the merged top-k.
+        delta_ids = np.broadcast_to(self.delta_ids, delta_scores.shape)
+        if delta_scores.shape[1] > k:
+            part = np.argpartition(delta_rank, k - 1, axis=1)[:, :k]
+            delta_ids, delta_scores = self.delta_ids[part], np.take_along_axis(delta_scores, part, axis=1)
+        ids = np.concatenate([ids, delta_ids], axis=1)
+        scores = np.concatenate([scores, delta_scores.astype(np.float32)], axis=1)
+        # Order best first (highest similarity or smallest distance), padding (-1) last.
+        rank = -scores if self.metric == "cosine" else scores.copy()
+        rank[ids < 0] = np.inf
+        order = np.argsort(rank, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(ids, order, axis=1), np.take_along_axis(scores, order, axis=1)
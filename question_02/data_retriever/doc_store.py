@@ -0,0 +1,216 @@
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+import numpy as np
+
+TEXTS_FILE = "texts.bin"
+OFFSETS_FILE = "offsets.i64"
+COLUMNS_FILE = "columns.json"
+COLUMN_TYPES = ("str", "int64", "float64")
+_MISSING = {"str": "", "int64": 0, "float64": float("nan")}
+
+
+def _memmap(path: str, dtype) -> np.ndarray:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def _encode(texts: Iterable[str]):
+    encoded = [t.encode("utf-8") for t in texts]
+    return b"".join(encoded), np.cumsum([len(b) for b in encoded], dtype=np.int64)
+
+
+class TextColumn:
+    """Strings stored as one contiguous UTF-8 buffer plus an int64 array of end offsets.
+
+    That is 8 bytes of overhead per string instead of a Python str object
+    and a list slot. The `base` arrays are immutable and may be
+    memory-mapped; `appended` writes to a growable in-memory tail that is
+    shared with older views of the column. Older views never read past their
+    own length, so as long as writers only append to the latest view
+    (under their own lock), readers of earlier views are never disturbed.
+    """
+
+    def __init__(self, base_buffer: np.ndarray, base_offsets: np.ndarray, tail_buffer: Optional[np.ndarray] = None,
+                 tail_offsets: Optional[np.ndarray] = None, size: Optional[int] = None):
+        self.base_buffer = base_buffer
+        self.base_offsets = base_offsets
+        self._tail_buffer = tail_buffer if tail_buffer is not None else np.empty(0, dtype=np.uint8)
+        self._tail_offsets = tail_offsets if tail_offsets is not None else np.empty(0, dtype=np.int64)
+        self._size = len(base_offsets) if size is None else size
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str]) -> "TextColumn":
+        buffer, offsets = _encode(texts)
+        return cls(np.frombuffer(buffer, dtype=np.uint8), offsets)
+
+    @classmethod
+    def open(cls, buffer_path: str, offsets_path: str) -> "TextColumn":
+        """Memory-map a column written as raw bytes + int64 end offsets (see `DocStoreWriter`)."""
+        return cls(_memmap(buffer_path, np.uint8), _memmap(offsets_path, np.int64))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, i: int) -> str:
+        if not 0 <= i < self._size:
+            raise IndexError(i)
+        buffer, offsets = self.base_buffer, self.base_offsets
+        if i >= len(offsets):
+            buffer, offsets, i = self._tail_buffer, self._tail_offsets, i - len(offsets)
+        start = int(offsets[i - 1]) if i > 0 else 0
+        return buffer[start:int(offsets[i])].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(self._size))
+
+    @property
+    def nbytes(self) -> int:
+        n_tail = self._size - len(self.base_offsets)
+        tail_bytes = int(self._tail_offsets[n_tail - 1]) if n_tail else 0
+        base_bytes = int(self.base_offsets[-1]) if len(self.base_offsets) else 0
+        return base_bytes + tail_bytes + 8 * self._size
+
+    def appended(self, texts: Iterable[str]) -> "TextColumn":
+        """A new view with `texts` added after the last row; this view is unchanged."""
+        buffer, ends = _encode(texts)
+        n_tail = self._size - len(self.base_offsets)
+        tail_end = int(self._tail_offsets[n_tail - 1]) if n_tail else 0
+        tail_buffer, tail_offsets = self._tail_buffer, self._tail_offsets
+        if tail_end + len(buffer) > len(tail_buffer):
+            tail_buffer = np.empty(max(2 * len(tail_buffer), tail_end + len(buffer), 1 << 16), dtype=np.uint8)
+            tail_buffer[:tail_end] = self._tail_buffer[:tail_end]
+        if n_tail + len(ends) > len(tail_offsets):
+            tail_offsets = np.empty(max(2 * len(tail_offsets), n_tail + len(ends), 1024), dtype=np.int64)
+            tail_offsets[:n_tail] = self._tail_offsets[:n_tail]
+        tail_buffer[tail_end:tail_end + len(buffer)] = np.frombuffer(buffer, dtype=np.uint8)
+        tail_offsets[n_tail:n_tail + len(ends)] = tail_end + ends
+        return TextColumn(self.base_buffer, self.base_offsets, tail_buffer, tail_offsets, self._size + len(ends))
+
+
+Column = Union[TextColumn, np.ndarray]
+
+
+class _FileColumnWriter:
+    """Appends one column to disk: raw values for numbers, bytes + end offsets for strings."""
+
+    def __init__(self, directory: str, name: str, dtype: str, n_rows: int):
+        self.dtype = dtype
+        if dtype == "str":
+            buffer_path, offsets_path = _text_paths(directory, name)
+            offsets = _memmap(offsets_path, np.int64)
+            if len(offsets) < n_rows:
+                raise ValueError(f"{offsets_path} holds {len(offsets)} rows, expected {n_rows}")
+            self.end = int(offsets[n_rows - 1]) if n_rows else 0
+            del offsets
+            # Unbuffered: one write per batch, so nothing reaches the files later than the caller expects.
+            self._values = open(buffer_path, "ab", buffering=0)
+            self._offsets = open(offsets_path, "ab", buffering=0)
+            self._values.truncate(self.end)
+            self._offsets.truncate(n_rows * 8)
+        else:
+            self._values = open(os.path.join(directory, f"{name}.{dtype}"), "ab", buffering=0)
+            self._offsets = None
+            self._values.truncate(n_rows * np.dtype(dtype).itemsize)
+
+    def append(self, values: List):
+        if self.dtype == "str":
+            buffer, ends = _encode(values)
+            ends += self.end
+            self._values.write(buffer)
+            self._offsets.write(ends.tobytes())
+            self.end = int(ends[-1]) if len(ends) else self.end
+        else:
+            self._values.write(np.asarray(values, dtype=self.dtype).tobytes())
+
+    def files(self):
+        return [f for f in (self._values, self._offsets) if f is not None]
+
+
+def _text_paths(directory: str, name: str):
+    if name == "texts":
+        return os.path.join(directory, TEXTS_FILE), os.path.join(directory, OFFSETS_FILE)
+    return os.path.join(directory, f"{name}.bin"), os.path.join(directory, f"{name}.i64")
+
+
+class DocStoreWriter:
+    """Append-only on-disk document store: the texts column plus typed metadata columns.
+
+    Texts go to `texts.bin` / `offsets.i64`; each metadata column is a raw
+    `<name>.int64` / `<name>.float64` file or, for strings, `<name>.bin` /
+    `<name>.i64`, and `columns.json` records their types. Files are only
+    ever appended to, so a writer reopened with `n_docs` (e.g. from a
+    checkpoint) truncates whatever a crashed run wrote after that document
+    and carries on.
+    """
+
+    def __init__(self, directory: str, n_docs: int = 0, columns: Optional[Dict[str, str]] = None):
+        os.makedirs(directory, exist_ok=True)
+        columns_path = os.path.join(directory, COLUMNS_FILE)
+        if os.path.exists(columns_path):
+            with open(columns_path) as f:
+                stored = json.load(f)
+            if columns is not None and columns != stored:
+                raise ValueError(f"doc store at {directory} has columns {stored}, not {columns}")
+            columns = stored
+        columns = dict(columns or {})
+        for name, dtype in columns.items():
+            if dtype not in COLUMN_TYPES or name == "texts":
+                raise ValueError(f"bad metadata column {name}: {dtype} (types are {COLUMN_TYPES})")
+        with open(columns_path, "w") as f:
+            json.dump(columns, f)
+        self.columns = columns
+        self.count = n_docs
+        self._texts = _FileColumnWriter(directory, "texts", "str", n_docs)
+        self._metadata = {name: _FileColumnWriter(directory, name, dtype, n_docs) for name, dtype in columns.items()}
+
+    def append(self, texts: List[str], metadata: Optional[Dict[str, List]] = None):
+        """Append documents; `metadata` maps column name to one value per text (missing values default)."""
+        metadata = metadata or {}
+        self._texts.append(texts)
+        for name, column in self._metadata.items():
+            values = metadata.get(name) or [None] * len(texts)
+            column.append([_MISSING[column.dtype] if v is None else v for v in values])
+        self.count += len(texts)
+
+    def flush(self):
+        for column in [self._texts, *self._metadata.values()]:
+            for f in column.files():
+                os.fsync(f.fileno())
+
+    def close(self):
+        self.flush()
+        for column in [self._texts, *self._metadata.values()]:
+            for f in column.files():
+                f.close()
+
+
+class DocStore:
+    """Read-only view of a `DocStoreWriter` directory with every column memory-mapped."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.texts = TextColumn.open(*_text_paths(directory, "texts"))
+        columns_path = os.path.join(directory, COLUMNS_FILE)
+        columns = {}
+        if os.path.exists(columns_path):
+            with open(columns_path) as f:
+                columns = json.load(f)
+        self.metadata: Dict[str, Column] = {
+            name: TextColumn.open(*_text_paths(directory, name)) if dtype == "str"
+            else _memmap(os.path.join(directory, f"{name}.{dtype}"), np.dtype(dtype))
+            for name, dtype in columns.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, i: int) -> str:
+        return self.texts[i]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.texts)
+
+    def metadata_of(self, i: int) -> Dict:
+        return {name: column[i] if isinstance(column, TextColumn) else column[i].item() for name, column in self.metadata.items()}
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+KEY_BYTES = 16
+
+
+def embedding_model_name(model) -> str:
+    """Best-effort stable name of an embedding model, unwrapping wrappers that expose `.base`."""
+    while hasattr(model, "base"):
+        model = model.base
+    return getattr(model, "model", None) or getattr(model, "model_name", None) or type(model).__name__
+
+
+def content_key(model_name: str, text: str) -> bytes:
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).digest()[:KEY_BYTES]
+
+
+def corpus_fingerprint(keys: List[bytes]) -> str:
+    """Short hash identifying an ordered corpus, used to name index snapshots."""
+    h = hashlib.sha256()
+    for key in keys:
+        h.update(key)
+    return h.hexdigest()[:16]
+
+
+class EmbeddingStore:
+    """Content-addressed embedding cache on disk.
+
+    Vectors are keyed by a hash of (model name, text) and appended to a flat
+    float32 file (`vectors.f32`) whose row offsets match the fixed-size keys in
+    `keys.bin`. The vectors are memory-mapped read-only, so every worker on the
+    host shares the same page cache instead of holding a private copy.
+    """
+
+    def __init__(self, path: str, model_name: str):
+        self.path = path
+        self.model_name = model_name
+        os.makedirs(path, exist_ok=True)
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._keys_path = os.path.join(path, "keys.bin")
+        self._meta_path = os.path.join(path, "meta.json")
+        self._lock = threading.Lock()
+        self.dim: Optional[int] = None
+        self._rows: Dict[bytes, int] = {}
+        self._n_rows = 0
+        self._vectors: Optional[np.memmap] = None
+        self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def keys_for(self, texts: List[str]) -> List[bytes]:
+        return [content_key(self.model_name, t) for t in texts]
+
+    def get_or_embed(self, texts: List[str], embed_fn: Callable[[List[str]], List[List[float]]]) -> np.ndarray:
+        """Return a (len(texts), dim) float32 matrix, embedding only texts missing from the store."""
+        keys = self.keys_for(texts)
+        missing = [i for i, k in enumerate(keys) if k not in self._rows]
+        if missing:
+            with self._lock, self._file_lock():
+                self._refresh()  # another worker may have written them meanwhile
+                missing = [i for i in missing if keys[i] not in self._rows]
+                if missing:
+                    new_keys, new_texts = {}, []
+                    for i in missing:
+                        if keys[i] not in new_keys:
+                            new_keys[keys[i]] = len(new_texts)
+                            new_texts.append(texts[i])
+                    vectors = np.asarray(embed_fn(new_texts), dtype=np.float32)
+                    self._append(list(new_keys), vectors)
+        rows = np.fromiter((self._rows[k] for k in keys), dtype=np.int64, count=len(keys))
+        if self._vectors is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.asarray(self._vectors[rows])
+
+    def _append(self, keys: List[bytes], vectors: np.ndarray):
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            with open(self._meta_path, "w") as f:
+                json.dump({"dim": self.dim}, f)
+        # Row i of vectors.f32 belongs to key i of keys.bin, so drop anything past the last committed
+        # key first: a crash mid-append leaves orphan vectors (or a torn key) that would otherwise shift
+        # every later key onto the wrong vector. Callers hold the file lock.
+        self._truncate(self._keys_path, self._n_rows * KEY_BYTES)
+        self._truncate(self._vectors_path, self._n_rows * self.dim * 4)
+        # Vectors first: a crash between the two writes leaves orphan vectors, never dangling keys.
+        with open(self._vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(self._keys_path, "ab") as f:
+            f.write(b"".join(keys))
+        self._refresh()
+
+    def _refresh(self):
+        if not os.path.exists(self._meta_path) or not os.path.exists(self._keys_path):
+            return
+        with open(self._meta_path) as f:
+            self.dim = int(json.load(f)["dim"])
+        # A torn trailing key from an interrupted append is ignored (and cut off by the next `_append`)
+        n_rows = os.path.getsize(self._keys_path) // KEY_BYTES
+        if n_rows == self._n_rows:
+            return
+        raw_keys = np.fromfile(self._keys_path, dtype=f"V{KEY_BYTES}", count=n_rows)
+        self._rows = {k.tobytes(): i for i, k in enumerate(raw_keys)}
+        self._n_rows = n_rows
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(n_rows, self.dim))
+
+    @staticmethod
+    def _truncate(path: str, size: int):
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            os.truncate(path, size)
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.path, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
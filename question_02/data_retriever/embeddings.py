@@ -0,0 +1,112 @@
+import re
+import zlib
+from typing import Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+EMBEDDING_BACKENDS = ("openai", "local", "hash")
+_TOKEN = re.compile(r"\w+")
+
+
+class LocalEmbeddings(Embeddings):
+    """sentence-transformers model running in-process on CPU, so no query waits on the network.
+
+    Inference is batched (`batch_size`), torch is pinned to `num_threads`
+    intra-op threads, and the output is L2-normalized float32. With
+    `backend="onnx"` (optionally a quantized file via
+    `model_kwargs={"file_name": ...}`) sentence-transformers runs the model
+    through ONNX Runtime instead of torch. The model is warmed up on
+    construction so the first request doesn't pay for lazy initialization.
+    """
+
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", batch_size: int = 64,
+                 num_threads: Optional[int] = None, backend: str = "torch", model_kwargs: Optional[Dict] = None,
+                 warmup: bool = True):
+        # Imported here so the OpenAI backend doesn't pay for loading torch.
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.encoder = SentenceTransformer(model_name, device="cpu", backend=backend, model_kwargs=model_kwargs)
+        if warmup:
+            self.encode(["warm-up"])
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = self.encoder.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return vectors.astype(np.float32, copy=False)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic, dependency-free embeddings for tests and benchmarks.
+
+    Each lowercased word is feature-hashed (crc32, seeded) to a signed
+    bucket and the counts are L2-normalized, so texts sharing words get
+    similar vectors and dense/hybrid retrieval behave plausibly with no
+    model and no network. Word buckets are memoized.
+    """
+
+    def __init__(self, dim: int = 256, seed: int = 0):
+        self.dim = dim
+        self.seed = seed
+        self.model_name = f"hash-{dim}-{seed}"
+        self._buckets: Dict[str, tuple] = {}
+
+    def _bucket(self, token: str) -> tuple:
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            h = zlib.crc32(token.encode("utf-8"), self.seed)
+            bucket = self._buckets.setdefault(token, (h % self.dim, 1.0 if h & 0x80000000 else -1.0))
+        return bucket
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        rows, cols, signs = [], [], []
+        for i, text in enumerate(texts):
+            for token in _TOKEN.findall(text.lower()):
+                col, sign = self._bucket(token)
+                rows.append(i)
+                cols.append(col)
+                signs.append(sign)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(vectors, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)), signs)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+
+def embed_array(model: Embeddings, texts: List[str]) -> np.ndarray:
+    """Document embeddings as a float32 matrix, skipping the list-of-lists round trip for in-process models."""
+    if isinstance(model, (LocalEmbeddings, HashEmbeddings)):
+        return model.encode(texts)
+    return np.asarray(model.embed_documents(texts), dtype=np.float32)
+
+
+def build_embedding_model(backend: str = "openai", **kwargs) -> Embeddings:
+    """Embedding model for `backend`: "openai" (OpenAIEmbeddings), "local" (LocalEmbeddings)
+    or "hash" (HashEmbeddings, deterministic and offline; for tests and benchmarks)."""
+    if backend == "openai":
+        return OpenAIEmbeddings(**kwargs)
+    if backend == "local":
+        return LocalEmbeddings(**kwargs)
+    if backend == "hash":
+        return HashEmbeddings(**kwargs)
+    raise ValueError(f"embedding backend must be one of {EMBEDDING_BACKENDS}")
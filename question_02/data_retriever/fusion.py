@@ -0,0 +1,65 @@
+from typing import List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+FUSION_METHODS = ("rrf", "score")
+
+
+def hybrid_weights(weight: Union[float, Sequence[float], None]) -> Tuple[float, float]:
+    """Resolve the request `weight` into (lexical, dense) weights.
+
+    A single float is the BM25 share and the dense side gets the rest;
+    a pair is used as-is; None splits evenly.
+    """
+    if weight is None:
+        return 0.5, 0.5
+    if isinstance(weight, (int, float)):
+        if not 0.0 <= weight <= 1.0:
+            raise ValueError("weight must be between 0 and 1")
+        return float(weight), 1.0 - float(weight)
+    if len(weight) != 2:
+        raise ValueError("weights must be a single float or a [bm25, dense] pair")
+    return float(weight[0]), float(weight[1])
+
+
+def reciprocal_rank_fusion(id_lists: List[np.ndarray], weights: Sequence[float], c: int = 60) -> Tuple[np.ndarray, np.ndarray]:
+    """Weighted RRF: each list adds weight / (c + rank) to its documents (rank starts at 1)."""
+    contributions = [
+        w / (c + np.arange(1, len(ids) + 1, dtype=np.float64)) for ids, w in zip(id_lists, weights)
+    ]
+    return _accumulate(id_lists, contributions)
+
+
+def score_fusion(id_lists: List[np.ndarray], score_lists: List[np.ndarray], weights: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """Weighted sum of min-max normalized scores. Scores must be similarities (higher is better)."""
+    contributions = []
+    for scores, w in zip(score_lists, weights):
+        scores = np.asarray(scores, dtype=np.float64)
+        if len(scores) == 0:
+            contributions.append(scores)
+            continue
+        span = scores.max() - scores.min()
+        normalized = (scores - scores.min()) / span if span > 0 else np.ones_like(scores)
+        contributions.append(w * normalized)
+    return _accumulate(id_lists, contributions)
+
+
+def fuse(id_lists: List[np.ndarray], score_lists: List[np.ndarray], weights: Sequence[float], k: int,
+         method: Optional[str] = "rrf") -> Tuple[np.ndarray, np.ndarray]:
+    """Fuse ranked lists with `method` ("rrf" or "score") and keep the top k (ids, fused scores)."""
+    if method == "score":
+        ids, scores = score_fusion(id_lists, score_lists, weights)
+    elif method in ("rrf", None):
+        ids, scores = reciprocal_rank_fusion(id_lists, weights)
+    else:
+        raise ValueError(f"fusion must be one of {FUSION_METHODS}")
+    return ids[:k], scores[:k]
+
+
+def _accumulate(id_lists: List[np.ndarray], contributions: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    all_ids = np.concatenate([np.asarray(ids, dtype=np.int64) for ids in id_lists])
+    if len(all_ids) == 0:
+        return all_ids, np.empty(0, dtype=np.float64)
+    ids, inverse = np.unique(all_ids, return_inverse=True)
+    scores = np.bincount(inverse, weights=np.concatenate(contributions))
+    order = np.lexsort((ids, -scores))
+    return ids[order], scores[order]
@@ -0,0 +1,121 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Tuple
+from prometheus_client import Counter, Gauge, Histogram
+
+# Registered on the default registry, so the Instrumentator's /metrics endpoint exports them.
+CACHE_EVENTS = Counter(
+    "retriever_cache_events_total",
+    "Retriever cache hits, misses and evictions",
+    ["cache", "event"]
+)
+
+# Label values are restricted to these sets (anything else is reported as "other"), so the
+# number of series stays fixed no matter what requests send.
+STAGES = ("safety", "embed", "bm25", "dense", "fusion", "respond", "serialize", "index_build")
+RETRIEVER_TYPES = ("bm25", "faiss", "hybrid", "none")
+
+STAGE_LATENCY = Histogram(
+    "retriever_stage_seconds",
+    "Latency of each retrieval pipeline stage",
+    ["stage", "retriever_type"],
+    buckets=(0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+             0.5, 1.0, 2.5),
+)
+CORPUS_DOCUMENTS = Gauge("retriever_corpus_documents", "Live documents in the served corpus")
+CORPUS_TEXT_BYTES = Gauge("retriever_corpus_text_bytes", "Bytes held by the corpus text column")
+INDEX_DOCUMENTS = Gauge("retriever_index_documents", "Live documents in each index (0 until built)", ["index"])
+INDEX_PENDING = Gauge(
+    "retriever_index_pending_documents", "Adds and deletes not yet compacted into each index's base", ["index"]
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "retriever_embedding_batch_size",
+    "Texts per upstream embedding call",
+    ["kind"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096),
+)
+QUERY_BATCH = EMBEDDING_BATCH_SIZE.labels(kind="query")
+DOCUMENT_BATCH = EMBEDDING_BATCH_SIZE.labels(kind="documents")
+
+_stage_children: Dict[Tuple[str, str], object] = {}
+_tracer = None
+
+
+def _bounded(value: str, allowed: Tuple[str, ...]) -> str:
+    return value if value in allowed else "other"
+
+
+def _stage_child(stage: str, retriever_type: str):
+    # labels() takes a lock and a dict lookup per call; keep the bound children ourselves
+    key = (_bounded(stage, STAGES), _bounded(retriever_type, RETRIEVER_TYPES))
+    child = _stage_children.get(key)
+    if child is None:
+        child = _stage_children.setdefault(key, STAGE_LATENCY.labels(stage=key[0], retriever_type=key[1]))
+    return child
+
+
+@contextmanager
+def stage_timer(stage: str, retriever_type: str = "none"):
+    """Time the block into `retriever_stage_seconds{stage, retriever_type}`, and as a span when tracing is on."""
+    child = _stage_child(stage, retriever_type)
+    t0 = time.perf_counter()
+    try:
+        if _tracer is None:
+            yield
+        else:
+            with _tracer.start_as_current_span(f"retriever.{stage}", attributes={"retriever_type": retriever_type}):
+                yield
+    finally:
+        child.observe(time.perf_counter() - t0)
+
+
+def in_context(fn: Callable) -> Callable:
+    """`fn` bound to the caller's context when tracing is on, so spans it opens on a thread pool
+    nest under the current request (executors don't carry contextvars over)."""
+    if _tracer is None:
+        return fn
+    ctx = contextvars.copy_context()
+    return lambda *args: ctx.run(fn, *args)
+
+
+def timed(stage: str, retriever_type: str, fn: Callable) -> Callable:
+    """`fn` run under `stage_timer`, for callables handed to a thread pool."""
+    def run(*args):
+        with stage_timer(stage, retriever_type):
+            return fn(*args)
+    return in_context(run)
+
+
+def observe_corpus(snap):
+    """Set the corpus and index size gauges from a newly published `CorpusSnapshot`."""
+    CORPUS_DOCUMENTS.set(snap.bm25.size)
+    CORPUS_TEXT_BYTES.set(snap.texts.nbytes)
+    INDEX_DOCUMENTS.labels(index="bm25").set(snap.bm25.size)
+    INDEX_PENDING.labels(index="bm25").set(snap.bm25.pending)
+    for metric in ("cosine", "l2"):
+        index = snap.indexes.get(metric)
+        INDEX_DOCUMENTS.labels(index=f"dense_{metric}").set(index.size if index is not None else 0)
+        INDEX_PENDING.labels(index=f"dense_{metric}").set(index.pending if index is not None else 0)
+
+
+def configure_tracing(service_name: str = "retrieval-service"):
+    """Export every `stage_timer` block as an OpenTelemetry span over OTLP/HTTP.
+
+    The endpoint comes from the standard OTEL_EXPORTER_OTLP_ENDPOINT /
+    OTEL_EXPORTER_OTLP_TRACES_ENDPOINT variables (e.g. a local collector on
+    http://localhost:4318). Needs the optional `opentelemetry-sdk` and
+    `opentelemetry-exporter-otlp-proto-http` packages; spans are batched and
+    exported off the request path.
+    """
+    global _tracer
+    from opentelemetry import trace
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("data_retriever")
@@ -1,77 +1,597 @@
-from typing import List, Dict, Optional
-from langchain_community.retrievers import BM25Retriever
-from langchain_community.vectorstores import FAISS
-from langchain.retrievers import EnsembleRetriever
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Iterable, List, Dict, Optional, Sequence, Tuple, Union
 from langchain_openai import OpenAIEmbeddings
-from langchain_core.embeddings import Embeddings
 import numpy as np
 from dotenv import load_dotenv
-load_dotenv()  
+from data_retriever.ann_benchmark import DEFAULT_CONFIGS, benchmark_indexes
+from data_retriever.bm25_index import BM25Index, LiveBM25Index
+from data_retriever.bulk_loader import INDEX_FILE, MANIFEST_FILE, VECTORS_FILE
+from data_retriever.batching import MicroBatchEmbeddings
+from data_retriever.cache import TTLCache, normalize_query
+from data_retriever.dense_index import DenseIndex, LiveDenseIndex, METRICS
+from data_retriever.doc_store import DocStore, TextColumn
+from data_retriever.embedding_store import EmbeddingStore, content_key, corpus_fingerprint, embedding_model_name
+from data_retriever.embeddings import embed_array
+from data_retriever.fusion import fuse, hybrid_weights
+from data_retriever.metrics import DOCUMENT_BATCH, QUERY_BATCH, in_context, observe_corpus, stage_timer, timed
+load_dotenv()
 
-class NormalizedEmbeddings(Embeddings):
-    def __init__(self, base: Embeddings):
-        self.base = base
+Hits = Tuple[np.ndarray, np.ndarray]
+# What the result cache holds: (document ids, scores), best first
+Ranked = Tuple[np.ndarray, np.ndarray]
 
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        raw = self.base.embed_documents(texts)
-        return [self._normalize(v) for v in raw]
 
-    def embed_query(self, text: str) -> List[float]:
-        raw = self.base.embed_query(text)
-        return self._normalize(raw)
-
-    def _normalize(self, v: List[float]) -> List[float]:
-        arr = np.array(v, dtype=float)
-        norm = np.linalg.norm(arr)
-        return (arr / norm).tolist() if norm > 0 else arr.tolist()
+@dataclass(frozen=True)
+class CorpusSnapshot:
+    """One consistent version of the corpus and its indexes.
 
+    Writers build a new snapshot and swap the reference; a request reads
+    everything from the snapshot it started with, so it never sees a
+    half-applied write. Rows are append-only between compactions: updating a
+    document deletes its row and appends a new one under the same document
+    id, and compaction renumbers the live rows from 0.
+    """
+    texts: TextColumn  # by row, including rows deleted since the last compaction
+    doc_ids: np.ndarray  # by row, -1 once deleted
+    rows: np.ndarray  # by document id, -1 once deleted
+    bm25: LiveBM25Index
+    indexes: Dict[str, LiveDenseIndex]
+    # (rows, vectors) chunks of every embedded row; None when not all of them are in memory
+    vectors: Optional[Tuple[Tuple[np.ndarray, np.ndarray], ...]]
+    version: int
 
 class SimpleRetriever:
-    def __init__(self, snippets: List[str],  embedding_model=None):
+    def __init__(self, snippets: List[str],  embedding_model=None, eager: bool = False, cache_dir: Optional[str] = None,
+                 cache_size: int = 1024, cache_ttl: Optional[float] = 300.0, max_workers: int = 8,
+                 batch_window_ms: float = 0.0, max_batch_size: int = 32, index_type: str = "flat",
+                 index_params: Optional[Dict] = None, compact_ratio: float = 0.2):
+        """
+        Args:
+            snippets: the corpus to index
+            embedding_model: langchain embeddings (default OpenAIEmbeddings)
+            eager: build the dense indexes now instead of on the first dense query
+            cache_dir: if set, embeddings are kept in a content-addressed on-disk store and
+                the BM25/FAISS indexes are snapshotted there, so restarts and extra workers
+                load them instead of re-embedding the corpus
+            cache_size: max entries of the in-memory query-embedding and result caches (0 disables them)
+            cache_ttl: seconds before a cached query embedding or result expires (None keeps them until evicted)
+            max_workers: size of the thread pool `aretrieve` offloads BM25/FAISS scoring to
+            batch_window_ms: if > 0, concurrent query embeddings arriving within this window are
+                sent upstream as one batch of up to `max_batch_size` queries
+            index_type: dense index structure, "flat" (exact), "ivf_flat", "hnsw" or "ivf_pq"
+            index_params: build/search settings for `index_type`, e.g. nlist, hnsw_m, pq_m,
+                and the deployment defaults nprobe / ef_search (overridable per request)
+            compact_ratio: after a write, the BM25 and dense indexes are rebuilt once the documents
+                added or deleted since the last build exceed this fraction of the corpus
+        """
         self.embedding_model = embedding_model or OpenAIEmbeddings()
+        self.query_embedder = self.embedding_model
+        if batch_window_ms > 0:
+            self.query_embedder = MicroBatchEmbeddings(
+                self.embedding_model, max_batch_size=max_batch_size, max_wait_ms=batch_window_ms
+            )
+        self.cache_dir = cache_dir
+        self.index_type = index_type
+        self.index_params = dict(index_params or {})
+        self.store: Optional[EmbeddingStore] = None
+        # Columnar per-document metadata, by document id, for corpora loaded with `from_bulk`
+        self.metadata: Optional[DocStore] = None
+        self.compact_ratio = compact_ratio
+        # Serializes writers and lazy index builds; readers never take it.
+        self._index_lock = threading.Lock()
+        self._snapshot: Optional[CorpusSnapshot] = None
+        self.query_cache = TTLCache("query_embedding", cache_size, cache_ttl)
+        self.result_cache = TTLCache("retrieval_result", cache_size, cache_ttl)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="retriever")
 
-        self.bm25 = BM25Retriever.from_texts(
-            snippets, metadatas=[{"source": "bm25"}] * len(snippets)
-        )
+        if cache_dir:
+            self.store = EmbeddingStore(
+                os.path.join(cache_dir, "embeddings"), embedding_model_name(self.embedding_model)
+            )
 
         self.snippets = snippets
+        if eager:
+            self.build_indexes()
+
+    @classmethod
+    def from_bulk(cls, directory: str, embedding_model=None, eager: bool = False, **kwargs) -> "SimpleRetriever":
+        """Serve a corpus written by `data_retriever.bulk_loader`: texts come from its doc store
+        and the dense index and vectors (memory-mapped) are used as-is, so nothing is re-embedded.
+        `index_params` in kwargs only add search defaults (nprobe / ef_search) to the manifest's."""
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        kwargs["index_type"] = manifest["index_type"]
+        kwargs["index_params"] = {**manifest["index_params"], **(kwargs.get("index_params") or {})}
+        store = DocStore(os.path.join(directory, "docs"))
+        retriever = cls(store.texts, embedding_model, **kwargs)
+        retriever.metadata = store if store.metadata else None
+        model_name = embedding_model_name(retriever.embedding_model)
+        if model_name != manifest["embedding_model"]:
+            raise ValueError(f"{directory} was embedded with {manifest['embedding_model']}, not {model_name}")
+
+        n = manifest["docs"]
+        vectors = np.memmap(os.path.join(directory, VECTORS_FILE), dtype=np.float32, mode="r", shape=(n, manifest["dim"]))
+        index = DenseIndex.load(
+            os.path.join(directory, INDEX_FILE), manifest["metric"], manifest["index_type"],
+            retriever.index_params.get("nprobe"), retriever.index_params.get("ef_search"),
+        )
+        with retriever._index_lock:
+            retriever._publish(replace(
+                retriever._snapshot, indexes={manifest["metric"]: LiveDenseIndex(index)}, vectors=((np.arange(n), vectors),)
+            ))
+        if eager:
+            retriever.build_indexes()
+        return retriever
+
+    @property
+    def snippets(self) -> List[str]:
+        """Texts of the live documents, in row order."""
+        snap = self._snapshot
+        return [snap.texts[r] for r in np.flatnonzero(snap.doc_ids >= 0)]
+
+    @snippets.setter
+    def snippets(self, snippets: Union[Sequence[str], TextColumn]):
+        """Replace the whole corpus: rebuild BM25, drop the dense indexes and invalidate cached results.
+        Document ids restart at 0 in list order."""
+        texts = snippets if isinstance(snippets, TextColumn) else TextColumn.from_texts(snippets)
+        with self._index_lock:
+            indexes = {}
+            if self.cache_dir:
+                for metric in METRICS:
+                    path = self._snapshot_path(self._dense_snapshot_name(metric), texts, dense=True)
+                    if os.path.exists(path):
+                        indexes[metric] = LiveDenseIndex(DenseIndex.load(
+                            path, metric, self.index_type,
+                            self.index_params.get("nprobe"), self.index_params.get("ef_search"),
+                        ))
+            ids = np.arange(len(texts))
+            self._publish(CorpusSnapshot(
+                texts, ids, ids.copy(), LiveBM25Index(self._load_or_build_bm25(texts)), indexes, None,
+                self._snapshot.version + 1 if self._snapshot else 1,
+            ))
+        # Query embeddings don't depend on the corpus, only the ranked results do.
+        self.result_cache.clear()
+
+    def _publish(self, snap: CorpusSnapshot):
+        """Swap in `snap` (with `_index_lock` held) and update the corpus/index size gauges."""
+        self._snapshot = snap
+        observe_corpus(snap)
+
+    def _dense_snapshot_name(self, metric: str) -> str:
+        name = f"faiss_{metric}_{self.index_type}"
+        if self.index_params:
+            params = json.dumps(self.index_params, sort_keys=True).encode("utf-8")
+            name += "_" + hashlib.sha256(params).hexdigest()[:8]
+        return name
+
+    def _snapshot_path(self, name: str, texts: Iterable[str], dense: bool) -> Optional[str]:
+        """Snapshot file for the corpus `texts`; dense snapshots also depend on the embedding model."""
+        if not self.cache_dir:
+            return None
+        model_name = self.store.model_name if dense else ""
+        fingerprint = corpus_fingerprint([content_key(model_name, t) for t in texts])
+        return os.path.join(self.cache_dir, f"{name}_{fingerprint}")
+
+    def _load_or_build_bm25(self, texts: TextColumn) -> BM25Index:
+        path = self._snapshot_path("bm25index", texts, dense=False)
+        if path and os.path.exists(path):
+            return BM25Index.load(path)
+        bm25 = BM25Index.build(texts)
+        if path:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            bm25.save(tmp_path)
+            try:
+                os.replace(tmp_path, path)
+            except OSError:  # another worker published the same snapshot first
+                shutil.rmtree(tmp_path, ignore_errors=True)
+        return bm25
+
+    def build_indexes(self):
+        """Embed the corpus once and build the dense index for every supported metric."""
+        for metric in METRICS:
+            self._get_index(metric)
+
+    def _embed_documents(self, texts: List[str]) -> np.ndarray:
+        def embed(texts: List[str]) -> np.ndarray:
+            DOCUMENT_BATCH.observe(len(texts))
+            return embed_array(self.embedding_model, texts)
+
+        if self.store is not None:
+            return self.store.get_or_embed(texts, embed)
+        return embed(texts)
+
+    def _corpus_vectors(self, snap: CorpusSnapshot) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, vectors) of every live document, embedding only if they aren't in memory."""
+        if snap.vectors is None:
+            rows = np.flatnonzero(snap.doc_ids >= 0)
+            return rows, self._embed_documents([snap.texts[r] for r in rows])
+        rows = np.concatenate([chunk[0] for chunk in snap.vectors])
+        vectors = np.concatenate([chunk[1] for chunk in snap.vectors])
+        live = snap.doc_ids[rows] >= 0
+        return rows[live], vectors[live]
+
+    def _build_dense(self, snap: CorpusSnapshot, rows: np.ndarray, vectors: np.ndarray, metric: str) -> DenseIndex:
+        # Until a document is deleted rows are list positions, and the index can be snapshotted
+        # under the corpus fingerprint; afterwards vectors are added under their row ids.
+        pristine = len(rows) == len(snap.texts)
+        index = DenseIndex.build(vectors, metric, self.index_type, ids=None if pristine else rows, **self.index_params)
+        path = self._snapshot_path(self._dense_snapshot_name(metric), snap.texts, dense=True) if pristine else None
+        if path:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            index.save(tmp_path)
+            os.replace(tmp_path, path)
+        return index
+
+    def _get_index(self, metric: str) -> Tuple[CorpusSnapshot, LiveDenseIndex]:
+        """The current snapshot and its dense index for `metric`, building the index on first use."""
+        metric = "cosine" if metric == "cosine" else "l2"
+        snap = self._snapshot
+        index = snap.indexes.get(metric)
+        if index is not None:
+            return snap, index
+        with self._index_lock:
+            snap = self._snapshot
+            index = snap.indexes.get(metric)
+            if index is None:
+                with stage_timer("index_build"):
+                    rows, vectors = self._corpus_vectors(snap)
+                    index = LiveDenseIndex(self._build_dense(snap, rows, vectors, metric))
+                snap = replace(snap, indexes={**snap.indexes, metric: index}, vectors=((rows, vectors),))
+                self._publish(snap)
+        return snap, index
+
+    async def _aget_index(self, metric: str) -> Tuple[CorpusSnapshot, LiveDenseIndex]:
+        index = self._snapshot.indexes.get("cosine" if metric == "cosine" else "l2")
+        if index is not None:
+            return self._get_index(metric)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._get_index, metric)
+
+    def add_documents(self, texts: List[str]) -> List[int]:
+        """Index new documents and return their ids. Only the new texts are embedded,
+        and only if a dense index has already been built."""
+        with self._index_lock:
+            snap = self._snapshot
+            doc_ids = list(range(len(snap.rows), len(snap.rows) + len(texts)))
+            self._apply(snap, np.empty(0, dtype=np.int64), texts, doc_ids)
+        return doc_ids
+
+    def update_documents(self, documents: Dict[int, str]):
+        """Replace the text of existing documents, keeping their ids."""
+        with self._index_lock:
+            snap = self._snapshot
+            doc_ids = list(documents)
+            self._apply(snap, self._rows_of(snap, doc_ids), [documents[i] for i in doc_ids], doc_ids)
+
+    def delete_documents(self, doc_ids: Iterable[int]):
+        with self._index_lock:
+            snap = self._snapshot
+            self._apply(snap, self._rows_of(snap, doc_ids), [], [])
+
+    @staticmethod
+    def _rows_of(snap: CorpusSnapshot, doc_ids: Iterable[int]) -> np.ndarray:
+        doc_ids = np.unique(np.asarray(list(doc_ids), dtype=np.int64))
+        known = (doc_ids >= 0) & (doc_ids < len(snap.rows))
+        rows = np.full(len(doc_ids), -1, dtype=np.int64)
+        rows[known] = snap.rows[doc_ids[known]]
+        if (rows < 0).any():
+            raise KeyError(f"unknown document ids: {doc_ids[rows < 0].tolist()}")
+        return rows
+
+    def _apply(self, snap: CorpusSnapshot, removed_rows: np.ndarray, texts: List[str], doc_ids: List[int]):
+        """Publish a snapshot with `removed_rows` deleted and `texts` appended as documents `doc_ids`.
+
+        Called with `_index_lock` held. Queries keep running against the old snapshot
+        until the new one is swapped in.
+        """
+        n_rows = len(snap.texts)
+        new_rows = np.arange(n_rows, n_rows + len(texts))
+        vectors = self._embed_documents(texts) if texts and snap.indexes else None
+
+        # `snap` is the latest snapshot (we hold the lock), so appending to its column is safe.
+        all_texts = snap.texts.appended(texts) if texts else snap.texts
+        removed_texts = [all_texts[r] for r in removed_rows]
+        row_doc_ids = np.concatenate([snap.doc_ids, np.asarray(doc_ids, dtype=np.int64)])
+        row_doc_ids[removed_rows] = -1
+        rows = np.concatenate([snap.rows, np.full(max(0, max(doc_ids, default=-1) + 1 - len(snap.rows)), -1)])
+        rows[snap.doc_ids[removed_rows]] = -1
+        rows[np.asarray(doc_ids, dtype=np.int64)] = new_rows
 
-    def _make_faiss(self, metric: str, k: int):
-        emb = self.embedding_model
-        if metric == "cosine":
-            emb = NormalizedEmbeddings(self.embedding_model)
+        chunks = snap.vectors
+        if chunks is not None and len(texts):
+            chunks = chunks + ((new_rows, vectors),) if vectors is not None else None
+        new = CorpusSnapshot(
+            all_texts, row_doc_ids, rows,
+            snap.bm25.updated(removed_rows, removed_texts, texts),
+            {m: index.updated(removed_rows, new_rows, vectors) for m, index in snap.indexes.items()},
+            chunks, snap.version + 1,
+        )
+        if new.bm25.pending > self.compact_ratio * max(new.bm25.size, 1):
+            new = self._compacted(new)
+        self._publish(new)
+        self.result_cache.clear()
+
+    def _compacted(self, snap: CorpusSnapshot) -> CorpusSnapshot:
+        """Rebuild the text column, BM25 and every built dense index over the live documents only.
+
+        Live rows are renumbered 0..n-1 in their current order, so deleted and
+        replaced texts, tombstones and deltas are all dropped.
+        """
+        live = np.flatnonzero(snap.doc_ids >= 0)
+        texts = TextColumn.from_texts(snap.texts[r] for r in live)
+        doc_ids = snap.doc_ids[live]
+        rows = np.full(len(snap.rows), -1, dtype=np.int64)
+        rows[doc_ids] = np.arange(len(live))
+        indexes, chunks = {}, None
+        if snap.indexes:
+            old_rows, vectors = self._corpus_vectors(snap)
+            vectors = vectors[np.argsort(old_rows, kind="stable")]
+            # pristine again: positions are rows, but not worth a disk snapshot on every compaction
+            indexes = {m: LiveDenseIndex(DenseIndex.build(vectors, m, self.index_type, **self.index_params))
+                       for m in snap.indexes}
+            chunks = ((np.arange(len(live)), vectors),)
+        return replace(snap, texts=texts, doc_ids=doc_ids, rows=rows, bm25=snap.bm25.compacted(texts),
+                       indexes=indexes, vectors=chunks)
+
+    def texts_of(self, doc_ids: Iterable[int]) -> List[Optional[str]]:
+        """Current text of each document id, None for unknown or deleted ids."""
+        snap = self._snapshot
+        rows = [int(snap.rows[i]) if 0 <= i < len(snap.rows) else -1 for i in doc_ids]
+        return [snap.texts[r] if r >= 0 else None for r in rows]
+
+    def document(self, doc_id: int) -> Optional[Dict]:
+        text = self.texts_of([doc_id])[0]
+        if text is None:
+            return None
+        document = {"id": doc_id, "text": text}
+        if self.metadata is not None and doc_id < len(self.metadata):
+            document.update(self.metadata.metadata_of(doc_id))
+        return document
+
+    def corpus_stats(self) -> Dict:
+        snap = self._snapshot
+        return {
+            "documents": snap.bm25.size,
+            "text_bytes": snap.texts.nbytes,
+            "version": snap.version,
+            "pending": snap.bm25.pending,
+            "dense_indexes": {m: index.size for m, index in snap.indexes.items()},
+        }
+
+    def benchmark_ann(self, queries: List[str], k: int = 10, metric: str = "cosine", configs=DEFAULT_CONFIGS) -> List[Dict]:
+        """Recall@k and latency of each ANN index type on this corpus, relative to exact flat search."""
+        query_vecs = self._embed_queries([normalize_query(q) for q in queries], self.embedding_model.embed_documents)
+        _, vectors = self._corpus_vectors(self._snapshot)
+        return benchmark_indexes(vectors, query_vecs, metric, k, configs)
+
+    def _embed_query(self, query: str) -> np.ndarray:
+        query_vec = self.query_cache.get(query)
+        if query_vec is None:
+            if self.query_embedder is self.embedding_model:
+                QUERY_BATCH.observe(1)
+            query_vec = np.asarray(self.query_embedder.embed_query(query), dtype=np.float32)
+            self.query_cache.set(query, query_vec)
+        return query_vec
+
+    async def _aembed_query(self, query: str) -> np.ndarray:
+        query_vec = self.query_cache.get(query)
+        if query_vec is None:
+            if self.query_embedder is self.embedding_model:
+                QUERY_BATCH.observe(1)
+            query_vec = np.asarray(await self.query_embedder.aembed_query(query), dtype=np.float32)
+            self.query_cache.set(query, query_vec)
+        return query_vec
+
+    def _embed_queries(self, queries: List[str], embed_fn) -> np.ndarray:
+        """Stack cached query vectors and embed the missing ones with a single `embed_fn` call."""
+        vectors = {q: self.query_cache.get(q) for q in dict.fromkeys(queries)}
+        missing = [q for q, v in vectors.items() if v is None]
+        if missing:
+            QUERY_BATCH.observe(len(missing))
+            for q, v in zip(missing, embed_fn(missing)):
+                vectors[q] = np.asarray(v, dtype=np.float32)
+                self.query_cache.set(q, vectors[q])
+        return np.stack([vectors[q] for q in queries])
+
+    async def _aembed_queries(self, queries: List[str]) -> np.ndarray:
+        vectors = {q: self.query_cache.get(q) for q in dict.fromkeys(queries)}
+        missing = [q for q, v in vectors.items() if v is None]
+        if missing:
+            QUERY_BATCH.observe(len(missing))
+            for q, v in zip(missing, await self.embedding_model.aembed_documents(missing)):
+                vectors[q] = np.asarray(v, dtype=np.float32)
+                self.query_cache.set(q, vectors[q])
+        return np.stack([vectors[q] for q in queries])
+
+    @staticmethod
+    def _ranked(snap: CorpusSnapshot, rows: np.ndarray, scores: np.ndarray) -> Ranked:
+        return snap.doc_ids[rows], np.asarray(scores, dtype=np.float32)
+
+    def _respond(self, ranked: Ranked, retriever_type: str) -> Tuple[Optional[str], List[Dict]]:
+        """(text of the best document, [{"id", "score"}, ...]) for a cached or fresh ranking."""
+        with stage_timer("respond", retriever_type):
+            ids, scores = ranked
+            answer = self.texts_of(ids[:1])[0] if len(ids) else None
+            return answer, [{"id": int(i), "score": float(s)} for i, s in zip(ids, scores)]
+
+    @staticmethod
+    def _dense_hits(index: LiveDenseIndex, query_vec: np.ndarray, k: int, nprobe: Optional[int] = None,
+                    ef_search: Optional[int] = None) -> Hits:
+        """Top-k dense (rows, similarities); L2 distances are negated so higher is always better."""
+        ids, scores = index.search(query_vec, k, nprobe, ef_search)
+        return ids, scores if index.metric == "cosine" else -scores
+
+    def _fuse(self, snap: CorpusSnapshot, lexical: Hits, dense: Hits, top_k: int, weights, fusion: str) -> Ranked:
+        with stage_timer("fusion", "hybrid"):
+            bm25_ids, bm25_scores = lexical
+            matched = bm25_scores > 0  # zero-score BM25 fillers matched no query term
+            rows, scores = fuse(
+                [bm25_ids[matched], dense[0]], [bm25_scores[matched], dense[1]], hybrid_weights(weights), top_k, fusion
+            )
+            return self._ranked(snap, rows, scores)
+
+    def _cache_key(self, query: str, retriever_type: str, top_k: int, metric: str, weights, fusion: str,
+                   nprobe: Optional[int], ef_search: Optional[int]) -> tuple:
+        # Keyed by the snapshot version read before searching: searches only ever see that snapshot or a
+        # newer one, and once a newer one is published lookups use its version, so a ranking computed
+        # while a writer publishes can never be served for the new corpus.
+        weights = tuple(weights) if isinstance(weights, (list, tuple)) else weights
+        return (self._snapshot.version, query, retriever_type, top_k, metric, weights, fusion, nprobe, ef_search)
+
+    def retrieve(self,query: str,retriever_type: str = "faiss",  top_k: int = 3,metric: str = "cosine",
+                 weights: Union[float, List[float], None] = None, fusion: str = "rrf",
+                 nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        """
+        Args:
+            weights: hybrid only; the BM25 share as a float (dense gets the rest) or a [bm25, dense] pair
+            fusion: hybrid only; "rrf" (weighted reciprocal-rank fusion) or "score" (min-max normalized scores)
+            nprobe / ef_search: per-request override of the IVF / HNSW search breadth
+        Returns: (top document text or None, [{"id", "score"}, ...] best first). Scores are BM25 scores,
+            cosine similarities or L2 distances, or the fused score for hybrid; use `texts_of` for the texts.
+        """
+        query = normalize_query(query)
+        key = self._cache_key(query, retriever_type, top_k, metric, weights, fusion, nprobe, ef_search)
+        ranked = self.result_cache.get(key)
+        if ranked is None:
+            ranked = self._retrieve(query, retriever_type, top_k, metric, weights, fusion, nprobe, ef_search)
+            self.result_cache.set(key, ranked)
+        return self._respond(ranked, retriever_type)
+
+    async def aretrieve(self, query: str, retriever_type: str = "faiss", top_k: int = 3, metric: str = "cosine",
+                        weights: Union[float, List[float], None] = None, fusion: str = "rrf",
+                        nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        """Async `retrieve`: the query is embedded with `aembed_query` and the CPU-bound
+        BM25/FAISS scoring runs on the retriever's bounded thread pool, keeping the event loop free."""
+        query = normalize_query(query)
+        key = self._cache_key(query, retriever_type, top_k, metric, weights, fusion, nprobe, ef_search)
+        ranked = self.result_cache.get(key)
+        if ranked is not None:
+            return self._respond(ranked, retriever_type)
+        loop = asyncio.get_running_loop()
+        if retriever_type == "hybrid":
+            with stage_timer("embed", retriever_type):
+                query_vec = await self._aembed_query(query)
+            snap, index = await self._aget_index(metric)
+            lexical, dense = await asyncio.gather(
+                loop.run_in_executor(self.executor, timed("bm25", retriever_type, snap.bm25.search), query, top_k),
+                loop.run_in_executor(
+                    self.executor, timed("dense", retriever_type, self._dense_hits), index, query_vec, top_k,
+                    nprobe, ef_search,
+                ),
+            )
+            ranked = self._fuse(snap, lexical, dense, top_k, weights, fusion)
         else:
-            emb = self.embedding_model
+            query_vec = None
+            if retriever_type == "faiss":
+                with stage_timer("embed", retriever_type):
+                    query_vec = await self._aembed_query(query)
+            ranked = await loop.run_in_executor(
+                self.executor, in_context(self._retrieve), query, retriever_type, top_k, metric, weights, fusion,
+                nprobe, ef_search, query_vec,
+            )
+        self.result_cache.set(key, ranked)
+        return self._respond(ranked, retriever_type)
+
+    def retrieve_many(self, queries: List[str], retriever_type: str = "faiss", top_k: int = 3, metric: str = "cosine",
+                      weights: Union[float, List[float], None] = None, fusion: str = "rrf",
+                      nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> List[tuple]:
+        """Batched `retrieve`: all queries are embedded in one call and searched as a single
+        matrix against the dense index. Returns one (answer, hits) pair per query, in input order."""
+        queries = [normalize_query(q) for q in queries]
+        if not queries:
+            return []
+        query_vecs = None
+        if retriever_type in ("faiss", "hybrid"):
+            with stage_timer("embed", retriever_type):
+                query_vecs = self._embed_queries(queries, self.embedding_model.embed_documents)
+        ranked = self._retrieve_many(queries, retriever_type, top_k, metric, weights, fusion, nprobe, ef_search, query_vecs)
+        return [self._respond(r, retriever_type) for r in ranked]
 
-        vs = FAISS.from_texts(
-            self.snippets, emb, metadatas=[{"source": "faiss"}] * len(self.snippets)
+    async def aretrieve_many(self, queries: List[str], retriever_type: str = "faiss", top_k: int = 3,
+                             metric: str = "cosine", weights: Union[float, List[float], None] = None,
+                             fusion: str = "rrf", nprobe: Optional[int] = None,
+                             ef_search: Optional[int] = None) -> List[tuple]:
+        """Async `retrieve_many`, embedding with `aembed_documents` and searching on the thread pool."""
+        queries = [normalize_query(q) for q in queries]
+        if not queries:
+            return []
+        query_vecs = None
+        if retriever_type in ("faiss", "hybrid"):
+            with stage_timer("embed", retriever_type):
+                query_vecs = await self._aembed_queries(queries)
+        loop = asyncio.get_running_loop()
+        ranked = await loop.run_in_executor(
+            self.executor, in_context(self._retrieve_many), queries, retriever_type, top_k, metric, weights, fusion,
+            nprobe, ef_search, query_vecs,
         )
+        return [self._respond(r, retriever_type) for r in ranked]
 
-        return vs.as_retriever(search_kwargs={"k": k})
+    def _retrieve_many(self, queries: List[str], retriever_type: str, top_k: int, metric: str, weights,
+                       fusion: str, nprobe: Optional[int], ef_search: Optional[int],
+                       query_vecs: Optional[np.ndarray]) -> List[Ranked]:
+        if retriever_type not in ("bm25", "faiss", "hybrid"):
+            raise ValueError("retriever_type must be 'bm25', 'faiss', or 'hybrid'")
+        keys = [self._cache_key(q, retriever_type, top_k, metric, weights, fusion, nprobe, ef_search) for q in queries]
+        results = [self.result_cache.get(key) for key in keys]
+        todo = [i for i, r in enumerate(results) if r is None]
+        if not todo:
+            return results
+
+        snap = self._snapshot
+        if retriever_type in ("faiss", "hybrid"):
+            snap, index = self._get_index(metric)
+            with stage_timer("dense", retriever_type):
+                dense_ids, dense_scores = index.search_many(query_vecs[todo], top_k, nprobe, ef_search)
+        if retriever_type in ("bm25", "hybrid"):
+            with stage_timer("bm25", retriever_type):
+                bm25_ids, bm25_scores = snap.bm25.search_many([queries[i] for i in todo], top_k)
+
+        for row, i in enumerate(todo):
+            if retriever_type == "bm25":
+                results[i] = self._ranked(snap, bm25_ids[row], bm25_scores[row])
+            else:
+                keep = dense_ids[row] >= 0
+                dense = dense_ids[row][keep], dense_scores[row][keep]
+                if retriever_type == "faiss":
+                    results[i] = self._ranked(snap, *dense)
+                else:
+                    dense = dense if index.metric == "cosine" else (dense[0], -dense[1])
+                    results[i] = self._fuse(snap, (bm25_ids[row], bm25_scores[row]), dense, top_k, weights, fusion)
+            self.result_cache.set(keys[i], results[i])
+        return results
 
-    def retrieve(self,query: str,retriever_type: str = "faiss",  top_k: int = 3,metric: str = "cosine", weights: Optional[List[float]] = None):
+    def _retrieve(self, query: str, retriever_type: str, top_k: int, metric: str, weights, fusion: str,
+                  nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                  query_vec: Optional[np.ndarray] = None) -> Ranked:
         if retriever_type == "bm25":
-            self.bm25.k = top_k
-            chunks = self.bm25.invoke(query)
-            return chunks[0].page_content if chunks else None, chunks
+            snap = self._snapshot
+            with stage_timer("bm25", retriever_type):
+                return self._ranked(snap, *snap.bm25.search(query, top_k))
 
         elif retriever_type == "faiss":
-            retr = self._make_faiss(metric, top_k)
-            chunks = retr.invoke(query)
-            return chunks[0].page_content if chunks else None, chunks
+            if query_vec is None:
+                with stage_timer("embed", retriever_type):
+                    query_vec = self._embed_query(query)
+            snap, index = self._get_index(metric)
+            with stage_timer("dense", retriever_type):
+                return self._ranked(snap, *index.search(query_vec, top_k, nprobe, ef_search))
 
         elif retriever_type == "hybrid":
-            faiss_retr = self._make_faiss(metric, top_k)
-            self.bm25.k = top_k
-
-            retrievers = [self.bm25, faiss_retr]
-            if not weights:
-                weights = [0.5, 0.5]
-
-            ensemble = EnsembleRetriever(retrievers=retrievers, weights=weights)
-            chunks = ensemble.invoke(query)
-            return chunks[0].page_content if chunks else None, chunks
+            # Lexical and dense searches run concurrently; latency is roughly the slower of the two.
+            snap, index = self._get_index(metric)
+            lexical = self.executor.submit(timed("bm25", retriever_type, snap.bm25.search), query, top_k)
+            if query_vec is None:
+                with stage_timer("embed", retriever_type):
+                    query_vec = self._embed_query(query)
+            with stage_timer("dense", retriever_type):
+                dense = self._dense_hits(index, query_vec, top_k, nprobe, ef_search)
+            return self._fuse(snap, lexical.result(), dense, top_k, weights, fusion)
 
         else:
             raise ValueError("retriever_type must be 'bm25', 'faiss', or 'hybrid'")
-
@@ -8,12 +8,29 @@ ERROR_COUNT = Counter(
     ["method", "endpoint", "status_code"]
 )
 
+def endpoint_label(request: Request) -> str:
+    """Full route template of the request (/corpus/documents/{doc_id}), or "unmatched".
+
+    Raw paths (ids, scanners probing random URLs) would create a new series per
+    distinct URL. Some FastAPI versions keep included routes unprefixed
+    (`route.path_format` is /documents/{doc_id}), so the router prefix and any
+    root/mount path are taken from the concrete path, whose trailing segments
+    are the route's own.
+    """
+    route = request.scope.get("route")
+    if route is None:
+        return "unmatched"
+    template = getattr(route, "path_format", route.path)
+    segments = request.url.path.split("/")
+    prefix = "/".join(segments[:max(1, len(segments) - template.count("/"))])
+    return prefix + template if prefix else template
+
 async def error_tracking_middleware(request: Request, call_next):
     response: Response = await call_next(request)
     if response.status_code >= 400:  # Track only 4xx and 5xx
         ERROR_COUNT.labels(
             method=request.method,
-            endpoint=request.url.path,
+            endpoint=endpoint_label(request),
             status_code=response.status_code
         ).inc()
     return response
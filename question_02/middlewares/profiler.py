@@ -1,8 +1,44 @@
 import os
-from datetime import datetime
+import queue
+import random
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 from pyinstrument import Profiler
 from fastapi import Request
-class ProfilerUtils:    
+
+
+@dataclass
+class ProfilerSettings:
+    """Runtime-adjustable profiling controls (see the /admin/profiling endpoint).
+
+    A request is profiled when it is sampled (`sample_rate`), carries the
+    `X-Profile: 1` header, or was armed with `capture_next`. Sampled profiles
+    are only kept when the request took at least `slow_ms`; forced ones are
+    always kept.
+    """
+    sample_rate: float = float(os.getenv("PROFILE_SAMPLE_RATE", "0.01"))
+    slow_ms: float = float(os.getenv("PROFILE_SLOW_MS", "500"))
+    interval_ms: float = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+    header: str = "x-profile"
+    max_files: int = int(os.getenv("PROFILE_MAX_FILES", "500"))
+    max_age_days: int = int(os.getenv("PROFILE_MAX_AGE_DAYS", "7"))
+    capture_next: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def consume_capture(self) -> bool:
+        if self.capture_next <= 0:
+            return False
+        with self._lock:
+            if self.capture_next <= 0:
+                return False
+            self.capture_next -= 1
+            return True
+
+
+class ProfilerUtils:
     @staticmethod
     def generate_profile_filename(endpoint_path: str, prefix: str = ""):
         """Generate structured filename with timestamp"""
@@ -11,30 +47,104 @@ class ProfilerUtils:
         return f"{prefix}{timestamp}_{safe_endpoint}.html"
 
     @staticmethod
-    def get_profile_directory():
+    def get_profile_directory(root: str = "profiles"):
         profile_dir = os.path.join(
-            "profiles", 
+            root,
             datetime.now().strftime("%Y-%m-%d")
         )
         os.makedirs(profile_dir, exist_ok=True)
         return profile_dir
 
-    
+
+class ProfileWriter:
+    """Renders and writes profiles on a background thread, off the event loop.
+
+    The queue is bounded; when it is full new profiles are dropped rather
+    than slowing requests down. After each write the `root` directory is
+    rotated: day folders older than `max_age_days` are removed and the
+    oldest files are deleted beyond `max_files`.
+    """
+
+    def __init__(self, settings: ProfilerSettings, root: str = "profiles", max_queue: int = 64):
+        self.settings = settings
+        self.root = root
+        self.written = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_queue)
+        self._day_dir = (None, None)
+        self._thread = threading.Thread(target=self._run, name="profile-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, profiler: Profiler, endpoint_path: str, prefix: str = ""):
+        try:
+            self._queue.put_nowait((profiler, endpoint_path, prefix))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            profiler, endpoint_path, prefix = self._queue.get()
+            try:
+                html = profiler.output_html()
+                filepath = os.path.join(self._directory(), ProfilerUtils.generate_profile_filename(endpoint_path, prefix))
+                with open(filepath, "w") as f:
+                    f.write(html)
+                self.written += 1
+                self._rotate()
+            except Exception:
+                self.dropped += 1
+
+    def _directory(self) -> str:
+        # makedirs once per day instead of on every profile
+        day = datetime.now().date()
+        if self._day_dir[0] != day:
+            self._day_dir = (day, ProfilerUtils.get_profile_directory(self.root))
+        return self._day_dir[1]
+
+    def _rotate(self):
+        cutoff = (datetime.now() - timedelta(days=self.settings.max_age_days)).strftime("%Y-%m-%d")
+        files = []
+        for day in sorted(os.listdir(self.root)):
+            day_dir = os.path.join(self.root, day)
+            if not os.path.isdir(day_dir):
+                continue
+            if day < cutoff:
+                shutil.rmtree(day_dir, ignore_errors=True)
+                continue
+            files.extend(os.path.join(day_dir, name) for name in sorted(os.listdir(day_dir)))
+        # filenames start with a timestamp, so sorted order is oldest first
+        for path in files[:max(0, len(files) - self.settings.max_files)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+settings = ProfilerSettings()
+writer = ProfileWriter(settings)
+
+
 async def profile_http_middleware(request: Request, call_next):
+    forced = request.headers.get(settings.header) == "1" or settings.consume_capture()
+    if not forced and random.random() >= settings.sample_rate:
+        return await call_next(request)
 
-    profiler = Profiler()
+    profiler = Profiler(interval=settings.interval_ms / 1000.0)
     endpoint_path = request.url.path
+    t0 = time.perf_counter()
     profiler.start()
 
+    failed = True
     try:
         response = await call_next(request)
+        failed = False
         return response
     finally:
         profiler.stop()
-        
-        filename = ProfilerUtils.generate_profile_filename(endpoint_path)
-        profile_dir = ProfilerUtils.get_profile_directory()
-        filepath = os.path.join(profile_dir, filename)
-        with open(filepath, "w") as f:
-            f.write(profiler.output_html())
-
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        if forced or failed or elapsed_ms >= settings.slow_ms:
+            writer.submit(profiler, endpoint_path, prefix="slow_" if elapsed_ms >= settings.slow_ms else "")
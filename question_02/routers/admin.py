@@ -0,0 +1,27 @@
+from fastapi import APIRouter
+from schemas.request import ProfilingUpdate
+from middlewares.profiler import settings, writer
+router = APIRouter()
+
+
+def profiling_state():
+    return {
+        "sample_rate": settings.sample_rate,
+        "slow_ms": settings.slow_ms,
+        "capture_next": settings.capture_next,
+        "max_files": settings.max_files,
+        "max_age_days": settings.max_age_days,
+        "written": writer.written,
+        "dropped": writer.dropped,
+        "pending": writer.pending,
+    }
+
+@router.get("/profiling")
+async def get_profiling():
+    return profiling_state()
+
+@router.post("/profiling")
+async def update_profiling(body: ProfilingUpdate):
+    for name, value in body.model_dump(exclude_none=True).items():
+        setattr(settings, name, value)
+    return profiling_state()
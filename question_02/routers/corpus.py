@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Request
+from schemas.request import AddDocumentsRequest, DeleteDocumentsRequest, UpdateDocumentRequest
+router = APIRouter()
+
+# Plain `def` endpoints: writes embed the new texts, so FastAPI runs them on its threadpool.
+# Queries keep being served from the previous corpus snapshot until a write is published.
+
+@router.get("")
+def corpus_stats(request: Request):
+    return request.app.state.simple_retriever.corpus_stats()
+
+@router.get("/documents/{doc_id}")
+def get_document(request: Request, doc_id: int):
+    document = request.app.state.simple_retriever.document(doc_id)
+    if document is None:
+        return {"error": f"unknown document id: {doc_id}"}
+    return document
+
+@router.post("/documents")
+def add_documents(request: Request, body: AddDocumentsRequest):
+    retriever = request.app.state.simple_retriever
+    ids = retriever.add_documents(body.texts)
+    return {"ids": ids, **retriever.corpus_stats()}
+
+@router.put("/documents/{doc_id}")
+def update_document(request: Request, doc_id: int, body: UpdateDocumentRequest):
+    retriever = request.app.state.simple_retriever
+    try:
+        retriever.update_documents({doc_id: body.text})
+    except KeyError as e:
+        return {"error": e.args[0]}
+    return {"id": doc_id, **retriever.corpus_stats()}
+
+@router.delete("/documents/{doc_id}")
+def delete_document(request: Request, doc_id: int):
+    return delete_documents(request, DeleteDocumentsRequest(ids=[doc_id]))
+
+@router.post("/documents/delete")
+def delete_documents(request: Request, body: DeleteDocumentsRequest):
+    retriever = request.app.state.simple_retriever
+    try:
+        retriever.delete_documents(body.ids)
+    except KeyError as e:
+        return {"error": e.args[0]}
+    return {"ids": body.ids, **retriever.corpus_stats()}
@@ -1,64 +1,104 @@
+import os
 from fastapi import APIRouter,Request
-from schemas.request import QueryRequest, SimpleQueryRequest
+from fastapi.responses import JSONResponse
+from schemas.request import BatchQueryRequest, QueryRequest, SimpleQueryRequest
 from database.simple_data import DENYLIST
+from safety.denylist_filter import SafetyFilter
+from data_retriever.metrics import stage_timer
 router = APIRouter()
-def is_safe_query(query: str) -> bool:
-    query_lower = query.lower()
-    return not any(bad in query_lower for bad in DENYLIST)
+# DENYLIST_PATH (one term per line) overrides the built-in list; either source is hot-reloaded
+safety_filter = SafetyFilter(DENYLIST, path=os.getenv("DENYLIST_PATH") or None)
+
+def is_safe_query(query: str, retriever_type: str = "none") -> bool:
+    with stage_timer("safety", retriever_type):
+        return safety_filter.is_safe(query)
+
+def with_snippets(retriever, hits: list, snippet_chars: int | None, retriever_type: str = "none") -> list:
+    if snippet_chars:
+        with stage_timer("respond", retriever_type):
+            for hit, text in zip(hits, retriever.texts_of(hit["id"] for hit in hits)):
+                hit["snippet"] = text[:snippet_chars] if text is not None else None
+    return hits
+
+def render(payload: dict, retriever_type: str) -> JSONResponse:
+    # Serialized here rather than by FastAPI so the time shows up as the "serialize" stage
+    with stage_timer("serialize", retriever_type):
+        return JSONResponse(payload)
 
 @router.post("/answer")
 async def get_answer(request: Request, body: SimpleQueryRequest):
-    if not is_safe_query(body.query):
+    if not is_safe_query(body.query, "faiss"):
         return {"error": "Query contains forbidden content."}
     retriever = request.app.state.simple_retriever 
-    answer,top_chunks = retriever.retrieve(body.query, top_k=3)  
-    return {
+    answer,top_chunks = await retriever.aretrieve(body.query, top_k=3)  
+    return render({
         "query": body.query,
         "answer":answer,
-        "top_chunks": top_chunks,
-    }
+        "top_chunks": with_snippets(retriever, top_chunks, body.snippet_chars, "faiss"),
+    }, "faiss")
 
 @router.post("/bm25")
 async def bm25_retriever(request: Request, body: QueryRequest):
-    if not is_safe_query(body.query):
+    if not is_safe_query(body.query, "bm25"):
         return {"error": "Query contains forbidden content."}
     retriever = request.app.state.simple_retriever 
-    answer,top_chunks = retriever.retrieve(body.query,retriever_type="bm25", top_k=body.top_k)  
-    return {
+    answer,top_chunks = await retriever.aretrieve(body.query,retriever_type="bm25", top_k=body.top_k)  
+    return render({
         "query": body.query,
         "answer":answer,
         "retriever": "bm25",
         "top_k": body.top_k,
-        "top_chunks": top_chunks,
-    }
+        "top_chunks": with_snippets(retriever, top_chunks, body.snippet_chars, "bm25"),
+    }, "bm25")
 
 @router.post("/vector")
 async def vector_retriever(request: Request, body: QueryRequest):
-    if not is_safe_query(body.query):
+    if not is_safe_query(body.query, "faiss"):
         return {"error": "Query contains forbidden content."}
     retriever = request.app.state.simple_retriever 
-    answer,top_chunks = retriever.retrieve(body.query,retriever_type="faiss", top_k=body.top_k,metric=body.metric,) 
-    return {
+    answer,top_chunks = await retriever.aretrieve(body.query,retriever_type="faiss", top_k=body.top_k,metric=body.metric, nprobe=body.nprobe, ef_search=body.ef_search) 
+    return render({
         "query": body.query,
         "answer":answer,
         "retriever": "vector",
         "top_k": body.top_k,
         "metric":body.metric,
-        "top_chunks": top_chunks,
-    }
+        "top_chunks": with_snippets(retriever, top_chunks, body.snippet_chars, "faiss"),
+    }, "faiss")
 
 @router.post("/hybrid")
 async def hybrid_retriever(request: Request, body: QueryRequest):
-    if not is_safe_query(body.query):
+    if not is_safe_query(body.query, "hybrid"):
         return {"error": "Query contains forbidden content."}
     retriever = request.app.state.simple_retriever 
-    answer,top_chunks = retriever.retrieve(body.query,retriever_type="hybrid", top_k=body.top_k,metric=body.metric, weights=body.weight) 
-    return {
+    answer,top_chunks = await retriever.aretrieve(body.query,retriever_type="hybrid", top_k=body.top_k,metric=body.metric, weights=body.weight, fusion=body.fusion, nprobe=body.nprobe, ef_search=body.ef_search) 
+    return render({
         "query": body.query,
         "answer":answer,
         "retriever": "hybrid",
         "top_k": body.top_k,
         "metric":body.metric,
-        "weight": body.weight or 0.5,
-        "top_chunks": top_chunks,
-    }
+        "weight": body.weight if body.weight is not None else 0.5,
+        "fusion": body.fusion,
+        "top_chunks": with_snippets(retriever, top_chunks, body.snippet_chars, "hybrid"),
+    }, "hybrid")
+
+@router.post("/batch")
+async def batch_retriever(request: Request, body: BatchQueryRequest):
+    retriever = request.app.state.simple_retriever
+    safe = [is_safe_query(q, body.retriever_type) for q in body.queries]
+    safe_queries = [q for q, ok in zip(body.queries, safe) if ok]
+    answers = iter(await retriever.aretrieve_many(safe_queries, retriever_type=body.retriever_type, top_k=body.top_k, metric=body.metric, weights=body.weight, fusion=body.fusion, nprobe=body.nprobe, ef_search=body.ef_search))
+    results = []
+    for query, ok in zip(body.queries, safe):
+        if not ok:
+            results.append({"query": query, "error": "Query contains forbidden content."})
+            continue
+        answer, top_chunks = next(answers)
+        results.append({"query": query, "answer": answer, "top_chunks": with_snippets(retriever, top_chunks, body.snippet_chars, body.retriever_type)})
+    return render({
+        "retriever": body.retriever_type,
+        "top_k": body.top_k,
+        "metric": body.metric,
+        "results": results,
+    }, body.retriever_type)
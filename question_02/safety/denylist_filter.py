@@ -0,0 +1,131 @@
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+from prometheus_client import Counter
+
+SAFETY_FILTER_MATCHES = Counter(
+    "safety_filter_matches_total",
+    "Denylist terms matched in incoming queries",
+    ["term"]
+)
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"\w+")
+_END = ""  # trie key marking the end of a term; never a token since tokens are non-empty
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class DenylistMatcher:
+    """Denylist compiled once into a trie over word tokens.
+
+    Matching walks the query's tokens once, following the trie from each
+    position, so the cost depends on query length and the longest term
+    (in words), not on how many terms are listed. Terms only match whole
+    words ("skill" does not trip "kill", "Sussex" does not trip "sex"); a
+    trailing plural "s" is tolerated so "guns" still matches "gun".
+    """
+
+    def __init__(self, terms: List[str]):
+        self.trie: Dict = {}
+        for term in terms:
+            tokens = tokenize(term)
+            if not tokens:
+                continue
+            node = self.trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node[_END] = term
+
+    def find(self, text: str) -> List[str]:
+        tokens = tokenize(text)
+        found = []
+        for start in range(len(tokens)):
+            node = self.trie
+            for token in tokens[start:]:
+                child = node.get(token)
+                if child is None and token.endswith("s"):
+                    child = node.get(token[:-1])
+                if child is None:
+                    break
+                node = child
+                if _END in node:
+                    found.append(node[_END])
+        return found
+
+
+class SafetyFilter:
+    """Query safety check over a hot-reloadable denylist.
+
+    Terms come from `path` (one per line) when given, otherwise from the
+    `terms` list itself. At most every `refresh_interval` seconds the
+    source is checked (file mtime, or the list contents) and the matcher is
+    recompiled and swapped in if it changed. If a later reload fails (file
+    missing mid-rotation, unreadable), the error is logged and the last good
+    matcher keeps serving; only the initial load raises. Each matched term increments
+    `safety_filter_matches_total{term=...}`, whose cardinality is bounded by
+    the denylist.
+    """
+
+    def __init__(self, terms: Optional[List[str]] = None, path: Optional[str] = None, refresh_interval: float = 5.0):
+        self.terms = terms if terms is not None else []
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self._reload_error: Optional[str] = None
+        self.matcher = DenylistMatcher([])
+        self.reload()
+
+    def _source_version(self):
+        if self.path:
+            return os.stat(self.path).st_mtime_ns
+        return tuple(self.terms)
+
+    def _load_terms(self) -> List[str]:
+        if self.path:
+            with open(self.path, encoding="utf-8") as f:
+                return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        return list(self.terms)
+
+    def reload(self, force: bool = True):
+        """Recompile the matcher; with force=False only if the source changed."""
+        with self._lock:
+            version = self._source_version()
+            if force or version != self._version:
+                self.matcher = DenylistMatcher(self._load_terms())
+                self._version = version
+            self._checked_at = time.monotonic()
+
+    def _refresh(self):
+        try:
+            self.reload(force=False)
+        except (OSError, ValueError) as e:
+            with self._lock:
+                self._checked_at = time.monotonic()
+                # once per distinct failure, not on every refresh_interval
+                if str(e) != self._reload_error:
+                    logger.error("denylist reload from %s failed, keeping the last loaded terms: %s", self.path, e)
+                self._reload_error = str(e)
+            return
+        if self._reload_error is not None:
+            logger.info("denylist reload from %s recovered", self.path)
+            self._reload_error = None
+
+    def matches(self, query: str) -> List[str]:
+        if time.monotonic() - self._checked_at >= self.refresh_interval:
+            self._refresh()
+        return self.matcher.find(query)
+
+    def is_safe(self, query: str) -> bool:
+        found = self.matches(query)
+        for term in found:
+            SAFETY_FILTER_MATCHES.labels(term=term).inc()
+        return not found
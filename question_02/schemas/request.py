@@ -1,11 +1,50 @@
-from pydantic import BaseModel
+from typing import Annotated, Literal
+from pydantic import BaseModel, Field
+
+# Hybrid weight: the BM25 share in [0, 1] (dense gets the rest) or an explicit [bm25, dense] pair
+HybridWeight = Annotated[float, Field(ge=0, le=1)] | Annotated[list[float], Field(min_length=2, max_length=2)] | None
+# Hits carry only the document id and score unless a snippet of this many characters is requested
+SnippetChars = Annotated[int, Field(ge=1)] | None
+# Upper bound on one /retriever/batch request, so a single call can't exhaust memory
+MAX_BATCH_QUERIES = 4096
 
 class SimpleQueryRequest(BaseModel):
     query: str
+    snippet_chars: SnippetChars = None
 
 class QueryRequest(BaseModel):
     query: str
     top_k: int = 3
     metric: str = "cosine"
-    weight: float | None = None
-      
\ No newline at end of file
+    weight: HybridWeight = None
+    fusion: Literal["rrf", "score"] = "rrf"
+    nprobe: Annotated[int, Field(ge=1)] | None = None
+    ef_search: Annotated[int, Field(ge=1)] | None = None
+    snippet_chars: SnippetChars = None
+      
+class BatchQueryRequest(BaseModel):
+    queries: Annotated[list[str], Field(max_length=MAX_BATCH_QUERIES)]
+    retriever_type: Literal["bm25", "faiss", "hybrid"] = "faiss"
+    top_k: int = 3
+    metric: str = "cosine"
+    weight: HybridWeight = None
+    fusion: Literal["rrf", "score"] = "rrf"
+    nprobe: Annotated[int, Field(ge=1)] | None = None
+    ef_search: Annotated[int, Field(ge=1)] | None = None
+    snippet_chars: SnippetChars = None
+
+class ProfilingUpdate(BaseModel):
+    sample_rate: Annotated[float, Field(ge=0, le=1)] | None = None
+    slow_ms: Annotated[float, Field(ge=0)] | None = None
+    capture_next: Annotated[int, Field(ge=0)] | None = None
+    max_files: Annotated[int, Field(ge=1)] | None = None
+    max_age_days: Annotated[int, Field(ge=1)] | None = None
+
+class AddDocumentsRequest(BaseModel):
+    texts: Annotated[list[str], Field(min_length=1)]
+
+class UpdateDocumentRequest(BaseModel):
+    text: str
+
+class DeleteDocumentsRequest(BaseModel):
+    ids: Annotated[list[int], Field(min_length=1)]
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the service is run from question_02, which its modules import from (`from data_retriever.x import ...`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,104 @@
+import random
+import numpy as np
+import pytest
+from data_retriever.bm25_index import BM25Index, LiveBM25Index
+
+rank_bm25 = pytest.importorskip("rank_bm25")
+
+WORDS = "python java go rust sql react aws docker kubernetes ml data senior junior engineer remote".split()
+
+
+def random_texts(n, seed=0):
+    rng = random.Random(seed)
+    # a few very common words push some IDFs negative, exercising the epsilon floor
+    return [" ".join(rng.choice(WORDS[:4] * 3 + WORDS) for _ in range(rng.randint(1, 12))) for _ in range(n)]
+
+
+def assert_matches_okapi(ids, scores, expected, k):
+    """`ids`/`scores` are a top-k of `expected` (rank_bm25 scores by position); ties may be ordered either way."""
+    assert len(ids) == min(k, len(expected))
+    np.testing.assert_allclose(scores, expected[ids], rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(scores, np.sort(expected)[::-1][:len(ids)], rtol=1e-5, atol=1e-6)
+
+
+QUERIES = ["python", "sql data", "rust go engineer", "remote senior ml", "unknown words", "", "python python java"]
+
+
+@pytest.mark.parametrize("k", [1, 3, 10, 500])
+def test_scores_match_rank_bm25(k):
+    texts = random_texts(200)
+    index = BM25Index.build(texts)
+    okapi = rank_bm25.BM25Okapi([t.split() for t in texts])
+    ids, scores = index.search_many(QUERIES, k)
+    for query, ids_q, scores_q in zip(QUERIES, ids, scores):
+        assert_matches_okapi(ids_q, scores_q, okapi.get_scores(query.split()), k)
+
+
+def test_search_equals_search_many():
+    index = BM25Index.build(random_texts(50))
+    ids, scores = index.search_many(QUERIES, 5)
+    for query, ids_q, scores_q in zip(QUERIES, ids, scores):
+        single_ids, single_scores = index.search(query, 5)
+        np.testing.assert_array_equal(single_ids, ids_q)
+        np.testing.assert_array_equal(single_scores, scores_q)
+
+
+def test_non_matching_documents_fill_lowest_ids_first():
+    index = BM25Index.build(["a b", "c d", "e f", "a c"])
+    ids, scores = index.search("a", 4)
+    assert sorted(ids[:2].tolist()) == [0, 3]
+    assert ids[2:].tolist() == [1, 2]
+    assert scores[2:].tolist() == [0.0, 0.0]
+
+
+def test_empty_index_and_zero_k():
+    empty = BM25Index.build([])
+    assert empty.search("python", 3)[0].size == 0
+    assert BM25Index.build(["python"]).search("python", 0)[0].size == 0
+
+
+def test_save_and_load_round_trip(tmp_path):
+    texts = random_texts(100)
+    index = BM25Index.build(texts)
+    index.save(str(tmp_path / "bm25"))
+    loaded = BM25Index.load(str(tmp_path / "bm25"))
+    for query in QUERIES:
+        np.testing.assert_array_equal(loaded.search(query, 10)[0], index.search(query, 10)[0])
+
+
+def test_live_index_matches_rank_bm25_over_live_documents():
+    texts = random_texts(120)
+    rows = list(texts)  # text by row, None once deleted
+    live = LiveBM25Index(BM25Index.build(texts))
+    rng = random.Random(1)
+    for step in range(6):
+        added = random_texts(5, seed=100 + step)
+        removed = rng.sample([r for r, t in enumerate(rows) if t is not None], 4)
+        if step:  # also delete rows that are still in the delta
+            removed.append(max(r for r, t in enumerate(rows) if t is not None))
+        live = live.updated(removed, [rows[r] for r in removed], added)
+        for r in removed:
+            rows[r] = None
+        rows.extend(added)
+
+        live_rows = np.asarray([r for r, t in enumerate(rows) if t is not None])
+        okapi = rank_bm25.BM25Okapi([rows[r].split() for r in live_rows])
+        assert live.size == len(live_rows)
+        for k in (3, 20):
+            ids, scores = live.search_many(QUERIES, k)
+            for query, ids_q, scores_q in zip(QUERIES, ids, scores):
+                assert np.isin(ids_q, live_rows).all()
+                assert_matches_okapi(np.searchsorted(live_rows, ids_q), scores_q, okapi.get_scores(query.split()), k)
+
+
+def test_compacted_live_index_equals_fresh_build():
+    texts = random_texts(60)
+    live = LiveBM25Index(BM25Index.build(texts)).updated([0, 5, 9], [texts[0], texts[5], texts[9]], ["python sql"])
+    live_texts = [t for r, t in enumerate(texts) if r not in (0, 5, 9)] + ["python sql"]
+    compacted, fresh = live.compacted(live_texts), BM25Index.build(live_texts)
+    assert compacted.pending == 0
+    for query in QUERIES:
+        ids, scores = compacted.search(query, 10)
+        fresh_ids, fresh_scores = fresh.search(query, 10)
+        np.testing.assert_array_equal(ids, fresh_ids)
+        np.testing.assert_allclose(scores, fresh_scores, rtol=1e-6)
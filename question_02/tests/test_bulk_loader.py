@@ -0,0 +1,79 @@
+import json
+import os
+import numpy as np
+import pytest
+from data_retriever.bulk_loader import VECTORS_FILE, BulkLoader
+from data_retriever.doc_store import DocStore
+from data_retriever.embeddings import HashEmbeddings
+from data_retriever.retriever import SimpleRetriever
+
+N_DOCS = 230
+
+
+class CrashingEmbeddings(HashEmbeddings):
+    """Raises on the `crash_at`-th embedding call, like a worker dying mid-run."""
+
+    def __init__(self, crash_at=None, **kwargs):
+        super().__init__(**kwargs)
+        self.crash_at = crash_at
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        if self.calls == self.crash_at:
+            raise RuntimeError("crash")
+        return super().encode(texts)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = tmp_path / "corpus.jsonl"
+    with open(path, "w") as f:
+        for i in range(N_DOCS):
+            f.write(json.dumps({"text": f"document {i} about {['python', 'sql', 'go'][i % 3]}", "year": 2000 + i}) + "\n")
+    return str(path)
+
+
+def load(out_dir, corpus, model, **kwargs):
+    loader = BulkLoader(str(out_dir), model, batch_size=16, max_workers=1, checkpoint_every=50,
+                        metadata_fields={"year": "int64"}, **kwargs)
+    loader.load(corpus)
+    return loader.finish()
+
+
+def test_resume_after_crash_truncates_orphan_rows(tmp_path, corpus):
+    with pytest.raises(RuntimeError):
+        load(tmp_path / "crashed", corpus, CrashingEmbeddings(crash_at=10, dim=32))
+    checkpoint = json.loads((tmp_path / "crashed" / "checkpoint.json").read_text())
+    # batches committed after the last checkpoint are on disk but not in the checkpoint
+    assert 0 < checkpoint["docs"] < 9 * 16
+    assert os.path.getsize(tmp_path / "crashed" / VECTORS_FILE) > checkpoint["docs"] * 32 * 4
+
+    resumed_model = CrashingEmbeddings(dim=32)
+    manifest = load(tmp_path / "crashed", corpus, resumed_model)
+    clean = load(tmp_path / "clean", corpus, HashEmbeddings(dim=32))
+    assert manifest["docs"] == clean["docs"] == N_DOCS
+    # only the uncommitted tail is re-embedded; committed vectors are replayed from disk
+    assert resumed_model.calls == -(-(N_DOCS - checkpoint["docs"]) // 16)
+
+    for name in ("crashed", "clean"):
+        store = DocStore(str(tmp_path / name / "docs"))
+        assert list(store) == [json.loads(line)["text"] for line in open(corpus)]
+        assert [store.metadata_of(i)["year"] for i in (0, N_DOCS - 1)] == [2000, 2000 + N_DOCS - 1]
+    vectors = [np.fromfile(tmp_path / name / VECTORS_FILE, dtype=np.float32) for name in ("crashed", "clean")]
+    np.testing.assert_array_equal(*vectors)
+
+    retriever = SimpleRetriever.from_bulk(str(tmp_path / "crashed"), embedding_model=HashEmbeddings(dim=32))
+    reference = SimpleRetriever.from_bulk(str(tmp_path / "clean"), embedding_model=HashEmbeddings(dim=32))
+    for query in ("document 7 about go", "sql"):
+        for retriever_type in ("faiss", "bm25", "hybrid"):
+            assert retriever.retrieve(query, retriever_type) == reference.retrieve(query, retriever_type)
+
+
+def test_finished_sources_are_skipped(tmp_path, corpus):
+    load(tmp_path / "out", corpus, HashEmbeddings(dim=32))
+    model = CrashingEmbeddings(dim=32)
+    loader = BulkLoader(str(tmp_path / "out"), model, metadata_fields={"year": "int64"})
+    stats = loader.load(corpus)
+    assert stats["new_docs"] == 0 and stats["docs"] == N_DOCS
+    assert model.calls == 0
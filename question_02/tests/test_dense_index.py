@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from data_retriever.ann_benchmark import benchmark_indexes, recall_at_k, synthetic_vectors
+from data_retriever.dense_index import INDEX_TYPES, DenseIndex
+
+N, DIM = 2000, 32
+
+
+@pytest.fixture(scope="module")
+def data():
+    vectors = synthetic_vectors(N + 50, DIM, n_clusters=20)
+    return vectors[:N], vectors[N:]
+
+
+@pytest.mark.parametrize("metric", ["cosine", "l2"])
+@pytest.mark.parametrize("index_type,params,min_recall", [
+    ("ivf_flat", {"nprobe": 16}, 0.95),
+    ("hnsw", {"ef_search": 128}, 0.95),
+    ("ivf_pq", {"nprobe": 16, "pq_m": 16}, 0.6),
+])
+def test_approximate_indexes_recall(data, metric, index_type, params, min_recall):
+    vectors, queries = data
+    exact, _ = DenseIndex.build(vectors, metric, "flat").search_many(queries, 10)
+    index = DenseIndex.build(vectors, metric, index_type, **params)
+    approx, _ = index.search_many(queries, 10)
+    assert index.size == N
+    assert recall_at_k(approx, exact) >= min_recall
+
+
+def test_search_breadth_can_be_overridden_per_call(data):
+    vectors, queries = data
+    exact, _ = DenseIndex.build(vectors, "cosine", "flat").search_many(queries, 10)
+    ivf = DenseIndex.build(vectors, "cosine", "ivf_flat", nprobe=1)
+    nlist = ivf.index.nlist
+    assert recall_at_k(ivf.search_many(queries, 10, nprobe=nlist)[0], exact) == 1.0
+    assert recall_at_k(ivf.search_many(queries, 10)[0], exact) < 1.0
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_ids_and_exclusions(data, index_type):
+    vectors, _ = data
+    ids = np.arange(N) * 7 + 3
+    index = DenseIndex.build(vectors, "l2", index_type, ids=ids, nprobe=64, ef_search=256)
+    found, _ = index.search(vectors[10], 5)
+    assert found[0] == ids[10]
+    assert np.isin(found, ids).all()
+    excluded, _ = index.search_many(vectors[10:11], 5, exclude=ids[10:11])
+    assert ids[10] not in excluded[0]
+
+
+def test_small_corpora_and_empty_results():
+    vectors = np.random.default_rng(0).normal(size=(3, 8)).astype(np.float32)
+    for index_type in INDEX_TYPES:
+        index = DenseIndex.build(vectors, "cosine", index_type)
+        ids, scores = index.search(vectors[0], 10)
+        assert len(ids) == len(scores) <= 3 and ids[0] == 0
+        assert index.search_many(vectors, 0)[0].shape == (3, 0)
+
+
+def test_unknown_index_type():
+    with pytest.raises(ValueError):
+        DenseIndex.create(8, "cosine", "lsh")
+
+
+def test_benchmark_reports_every_setting(data):
+    vectors, queries = data
+    configs = [("flat", {}, [{}]), ("hnsw", {"hnsw_m": 16}, [{"ef_search": 16}, {"ef_search": 64}])]
+    rows = benchmark_indexes(vectors, queries[:10], "cosine", 5, configs)
+    assert [(r["index_type"], r.get("ef_search")) for r in rows] == [("flat", None), ("hnsw", 16), ("hnsw", 64)]
+    assert rows[0]["recall@5"] == 1.0
+    assert all(0 <= r["recall@5"] <= 1 and r["index_bytes"] > 0 for r in rows)
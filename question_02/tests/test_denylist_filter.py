@@ -0,0 +1,70 @@
+import logging
+import os
+import time
+import pytest
+from safety.denylist_filter import DenylistMatcher, SafetyFilter
+
+
+@pytest.mark.parametrize("query,found", [
+    ("how do I kill a process", ["kill"]),
+    ("my skills include python", []),
+    ("jobs in Sussex", []),
+    ("buy GUNS online", ["gun"]),
+    ("Credit Card Numbers please", ["credit card"]),
+    ("credit score and card games", []),
+    ("kill, kill!", ["kill", "kill"]),
+    ("", []),
+])
+def test_matcher_matches_whole_words_and_phrases(query, found):
+    matcher = DenylistMatcher(["kill", "gun", "credit card", "sex", "  "])
+    assert matcher.find(query) == found
+
+
+def test_overlapping_terms_are_all_reported():
+    matcher = DenylistMatcher(["credit", "credit card", "card number"])
+    assert matcher.find("my credit card number") == ["credit", "credit card", "card number"]
+
+
+def write_terms(path, terms, mtime):
+    path.write_text("# denylist\n" + "\n".join(terms) + "\n", encoding="utf-8")
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_file_is_reloaded_when_it_changes(tmp_path):
+    path = tmp_path / "denylist.txt"
+    write_terms(path, ["kill"], 1_000_000_000)
+    safety = SafetyFilter(path=str(path), refresh_interval=0)
+    assert not safety.is_safe("kill it")
+    assert safety.is_safe("denylist")  # comment lines are not terms
+
+    write_terms(path, ["weapon"], 2_000_000_000)
+    assert safety.is_safe("kill it")
+    assert safety.matches("weapons") == ["weapon"]
+
+
+def test_failed_reload_keeps_the_last_good_terms(tmp_path, caplog):
+    path = tmp_path / "denylist.txt"
+    write_terms(path, ["kill"], 1_000_000_000)
+    safety = SafetyFilter(path=str(path), refresh_interval=0)
+    path.unlink()  # e.g. mid-rotation
+    with caplog.at_level(logging.ERROR, logger="safety.denylist_filter"):
+        assert safety.matches("kill") == ["kill"]
+        assert safety.matches("kill") == ["kill"]
+    assert len([r for r in caplog.records if r.levelno == logging.ERROR]) == 1  # once per distinct failure
+
+    write_terms(path, ["weapon"], 2_000_000_000)
+    assert safety.matches("weapon kill") == ["weapon"]
+
+
+def test_initial_load_failure_raises(tmp_path):
+    with pytest.raises(OSError):
+        SafetyFilter(path=str(tmp_path / "missing.txt"))
+
+
+def test_refresh_is_rate_limited():
+    terms = ["kill"]
+    safety = SafetyFilter(terms=terms, refresh_interval=3600)
+    terms.append("weapon")
+    assert safety.matches("weapon") == []
+    safety._checked_at = time.monotonic() - 3600
+    assert safety.matches("weapon") == ["weapon"]
@@ -0,0 +1,66 @@
+import math
+import numpy as np
+import pytest
+from data_retriever.doc_store import DocStore, DocStoreWriter, TextColumn
+
+TEXTS = ["python engineer", "", "naïve café ☕", "sql\nanalyst"]
+
+
+def test_text_column_round_trip():
+    column = TextColumn.from_texts(TEXTS)
+    assert len(column) == 4
+    assert list(column) == TEXTS
+    assert column[2] == "naïve café ☕"
+    assert column.nbytes == sum(len(t.encode("utf-8")) for t in TEXTS) + 8 * len(TEXTS)
+    with pytest.raises(IndexError):
+        column[4]
+
+
+def test_appended_views_leave_older_views_unchanged():
+    base = TextColumn.from_texts(TEXTS)
+    first = base.appended(["a"])
+    second = first.appended(["b" * 100_000, "c"])  # outgrows and reallocates the tail
+    third = second.appended(["d"])
+    assert list(base) == TEXTS
+    assert list(first) == TEXTS + ["a"]
+    assert list(second) == TEXTS + ["a", "b" * 100_000, "c"]
+    assert list(third) == TEXTS + ["a", "b" * 100_000, "c", "d"]
+
+
+def test_written_store_is_read_back_memory_mapped(tmp_path):
+    writer = DocStoreWriter(str(tmp_path), columns={"source": "str", "year": "int64", "score": "float64"})
+    writer.append(TEXTS[:2], {"source": ["a", "b"], "year": [2020, 2021], "score": [0.5, 1.5]})
+    writer.append(TEXTS[2:])  # missing metadata gets the column default
+    writer.close()
+
+    store = DocStore(str(tmp_path))
+    assert len(store) == 4
+    assert list(store) == TEXTS
+    assert isinstance(store.texts.base_buffer, np.memmap)
+    assert store.metadata_of(1) == {"source": "b", "year": 2021, "score": 1.5}
+    missing = store.metadata_of(3)
+    assert missing["source"] == "" and missing["year"] == 0 and math.isnan(missing["score"])
+
+
+def test_reopened_writer_truncates_rows_after_the_checkpoint(tmp_path):
+    writer = DocStoreWriter(str(tmp_path), columns={"year": "int64"})
+    writer.append(["kept 1", "kept 2"], {"year": [1, 2]})
+    writer.flush()
+    writer.append(["lost in a crash"], {"year": [3]})
+    writer.close()
+
+    resumed = DocStoreWriter(str(tmp_path), n_docs=2)
+    assert resumed.columns == {"year": "int64"}
+    resumed.append(["after resume"], {"year": [4]})
+    resumed.close()
+    store = DocStore(str(tmp_path))
+    assert list(store) == ["kept 1", "kept 2", "after resume"]
+    assert [store.metadata_of(i)["year"] for i in range(3)] == [1, 2, 4]
+
+
+def test_writer_rejects_mismatched_columns(tmp_path):
+    DocStoreWriter(str(tmp_path), columns={"year": "int64"}).close()
+    with pytest.raises(ValueError):
+        DocStoreWriter(str(tmp_path), columns={"year": "float64"})
+    with pytest.raises(ValueError):
+        DocStoreWriter(str(tmp_path / "other"), columns={"year": "date"})
@@ -0,0 +1,83 @@
+import os
+import numpy as np
+from data_retriever.dense_index import DenseIndex
+from data_retriever.embedding_store import KEY_BYTES, EmbeddingStore
+from data_retriever.embeddings import HashEmbeddings
+from data_retriever.retriever import SimpleRetriever
+
+
+class CountingEmbeddings(HashEmbeddings):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.embedded = []
+
+    def encode(self, texts):
+        self.embedded.extend(texts)
+        return super().encode(texts)
+
+
+def test_only_missing_texts_are_embedded(tmp_path):
+    model = CountingEmbeddings(dim=16)
+    store = EmbeddingStore(str(tmp_path), model.model_name)
+    first = store.get_or_embed(["a", "b", "a"], model.encode)
+    np.testing.assert_array_equal(first, model.encode(["a", "b", "a"]))
+    model.embedded.clear()
+
+    second = store.get_or_embed(["b", "c"], model.encode)
+    assert model.embedded == ["c"]
+    np.testing.assert_array_equal(second[0], first[1])
+
+    # another process (here: another instance) sees what was written
+    reopened = EmbeddingStore(str(tmp_path), model.model_name)
+    model.embedded.clear()
+    np.testing.assert_array_equal(reopened.get_or_embed(["a", "c"], model.encode), model.encode(["a", "c"])[:2])
+    assert model.embedded == ["a", "c"]  # only the reference call above
+    assert len(reopened) == 3
+
+
+def test_orphan_rows_from_a_crashed_append_are_truncated(tmp_path):
+    model = HashEmbeddings(dim=8)
+    store = EmbeddingStore(str(tmp_path), model.model_name)
+    store.get_or_embed(["a", "b"], model.encode)
+    # a crash between the vector and key writes leaves orphan vectors, and a torn key on top
+    with open(tmp_path / "vectors.f32", "ab") as f:
+        f.write(np.ones((3, 8), dtype=np.float32).tobytes())
+    with open(tmp_path / "keys.bin", "ab") as f:
+        f.write(b"\x01" * (KEY_BYTES // 2))
+
+    reopened = EmbeddingStore(str(tmp_path), model.model_name)
+    assert len(reopened) == 2
+    vectors = reopened.get_or_embed(["c", "a", "d"], model.encode)
+    np.testing.assert_allclose(vectors, model.encode(["c", "a", "d"]), rtol=1e-6)
+    assert os.path.getsize(tmp_path / "keys.bin") == 4 * KEY_BYTES
+    assert os.path.getsize(tmp_path / "vectors.f32") == 4 * 8 * 4
+    np.testing.assert_allclose(EmbeddingStore(str(tmp_path), model.model_name).get_or_embed(["d"], model.encode),
+                               model.encode(["d"]), rtol=1e-6)
+
+
+def test_restart_loads_snapshots_instead_of_embedding(tmp_path):
+    snippets = ["python engineer", "sql analyst", "go developer", "react frontend"]
+    model = CountingEmbeddings(dim=16)
+    first = SimpleRetriever(snippets, embedding_model=model, eager=True, cache_dir=str(tmp_path))
+    assert sorted(model.embedded) == sorted(snippets)  # once, shared by both metrics
+    expected = {m: first.retrieve("python", "faiss", metric=m) for m in ("cosine", "l2")}
+
+    model.embedded.clear()
+    second = SimpleRetriever(snippets, embedding_model=model, cache_dir=str(tmp_path))
+    assert set(second._snapshot.indexes) == {"cosine", "l2"}
+    for metric, result in expected.items():
+        assert second.retrieve("python", "faiss", metric=metric) == result
+    assert model.embedded == ["python"]  # the query, embedded once and cached
+
+    # a different corpus has a different fingerprint and is not served from these snapshots
+    third = SimpleRetriever(snippets[:3], embedding_model=model, cache_dir=str(tmp_path))
+    assert third._snapshot.indexes == {}
+
+
+def test_loaded_flat_index_is_memory_mapped_and_searchable(tmp_path):
+    vectors = np.random.default_rng(0).normal(size=(100, 16)).astype(np.float32)
+    index = DenseIndex.build(vectors, "cosine")
+    index.save(str(tmp_path / "flat.index"))
+    loaded = DenseIndex.load(str(tmp_path / "flat.index"), "cosine")
+    for a, b in zip(loaded.search_many(vectors[:5], 3), index.search_many(vectors[:5], 3)):
+        np.testing.assert_array_equal(a, b)
@@ -0,0 +1,142 @@
+import random
+import numpy as np
+import pytest
+from data_retriever.dense_index import DenseIndex, LiveDenseIndex, normalize_rows
+from data_retriever.embeddings import HashEmbeddings
+from data_retriever.retriever import SimpleRetriever
+
+WORDS = "python java go rust sql react aws docker kubernetes ml data senior junior engineer remote".split()
+QUERIES = ["python engineer", "sql data", "remote rust", "kubernetes aws docker"]
+
+
+def random_doc(rng):
+    # a distinct length per document keeps BM25 and dense scores free of exact ties, whose order
+    # (and through it, reciprocal-rank fusion) would otherwise depend on row numbering
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 10))) + " filler" * rng.randrange(1000)
+
+
+def exact_search(vectors, ids, query, k, metric):
+    if metric == "cosine":
+        scores = normalize_rows(vectors) @ normalize_rows(query[None])[0]
+        order = np.argsort(-scores, kind="stable")[:k]
+    else:
+        scores = ((vectors - query) ** 2).sum(axis=1)
+        order = np.argsort(scores, kind="stable")[:k]
+    return ids[order], scores[order]
+
+
+@pytest.mark.parametrize("metric", ["cosine", "l2"])
+def test_live_dense_index_adds_and_deletes(metric):
+    rng = np.random.default_rng(0)
+    vectors = {i: v for i, v in enumerate(rng.normal(size=(200, 16)).astype(np.float32))}
+    live = LiveDenseIndex(DenseIndex.build(np.stack(list(vectors.values())), metric))
+    for step in range(5):
+        added = np.arange(200 + 10 * step, 210 + 10 * step)
+        added_vectors = rng.normal(size=(10, 16)).astype(np.float32)
+        removed = rng.choice(sorted(vectors), 7, replace=False)  # base and delta ids alike
+        live = live.updated(removed, added, added_vectors)
+        for i in removed:
+            del vectors[i]
+        vectors.update(zip(added.tolist(), added_vectors))
+        assert live.size == len(vectors)
+
+        ids = np.asarray(sorted(vectors))
+        matrix = np.stack([vectors[i] for i in ids])
+        for query in rng.normal(size=(5, 16)).astype(np.float32):
+            got_ids, got_scores = live.search(query, 8)
+            want_ids, want_scores = exact_search(matrix, ids, query, 8, metric)
+            assert not np.isin(got_ids, removed).any()
+            np.testing.assert_array_equal(got_ids, want_ids)
+            np.testing.assert_allclose(got_scores, want_scores, rtol=1e-4, atol=1e-4)
+
+
+def assert_same_ranking(hits, expected):
+    """Same scores, and the same ids except for the order of exact ties (which may also differ at the cut-off)."""
+    scores = [h["score"] for h in hits]
+    np.testing.assert_allclose(scores, [h["score"] for h in expected], rtol=1e-5, atol=1e-6)
+    above_cutoff = lambda ranking: {(h["id"], round(h["score"], 4)) for h in ranking if h["score"] > scores[-1] + 1e-5}
+    assert above_cutoff(hits) == above_cutoff(expected)
+
+
+def churn(retriever, seed, steps=15):
+    """Random adds, updates and deletes; returns {doc id: text} of the live documents."""
+    rng = random.Random(seed)
+    docs = dict(enumerate(retriever.snippets))
+    for _ in range(steps):
+        new = [random_doc(rng) for _ in range(3)]
+        docs.update(zip(retriever.add_documents(new), new))
+        updates = {i: random_doc(rng) for i in rng.sample(sorted(docs), 2)}
+        retriever.update_documents(updates)
+        docs.update(updates)
+        deleted = rng.sample(sorted(docs), 2)
+        retriever.delete_documents(deleted)
+        for i in deleted:
+            del docs[i]
+    return docs
+
+
+@pytest.mark.parametrize("compact_ratio", [0.05, 1e9])
+def test_live_results_equal_a_fresh_rebuild(compact_ratio):
+    rng = random.Random(0)
+    embeddings = HashEmbeddings(dim=64)
+    retriever = SimpleRetriever([random_doc(rng) for _ in range(60)], embedding_model=embeddings,
+                                eager=True, compact_ratio=compact_ratio, cache_size=0)
+    retriever.retrieve("python", "faiss", metric="l2")  # build the second dense index too
+    docs = churn(retriever, seed=1)
+
+    # documents in row order, which is the position order of a retriever built from `snippets`
+    live_ids = retriever._snapshot.doc_ids[retriever._snapshot.doc_ids >= 0]
+    assert sorted(live_ids.tolist()) == sorted(docs)
+    assert retriever.snippets == [docs[i] for i in live_ids]
+    assert retriever.texts_of(sorted(docs)) == [docs[i] for i in sorted(docs)]
+    fresh = SimpleRetriever(retriever.snippets, embedding_model=embeddings, cache_size=0)
+    for query in QUERIES:
+        for retriever_type, metric in [("bm25", "cosine"), ("faiss", "cosine"), ("faiss", "l2"), ("hybrid", "cosine")]:
+            answer, hits = retriever.retrieve(query, retriever_type, top_k=5, metric=metric)
+            fresh_answer, fresh_hits = fresh.retrieve(query, retriever_type, top_k=5, metric=metric)
+            assert answer == retriever.texts_of([hits[0]["id"]])[0]
+            assert_same_ranking(hits, [{"id": int(live_ids[h["id"]]), "score": h["score"]} for h in fresh_hits])
+
+
+def test_compaction_drops_deleted_and_replaced_texts():
+    retriever = SimpleRetriever(["python engineer", "sql analyst", "go developer"],
+                                embedding_model=HashEmbeddings(dim=32), eager=True, compact_ratio=0.5)
+    for n in range(50):
+        retriever.update_documents({n % 3: f"rewrite {n} " * (n % 7 + 1)})
+    snap = retriever._snapshot
+    assert len(snap.texts) < 6  # rows are renumbered on compaction rather than growing with every update
+    assert retriever.corpus_stats()["documents"] == 3
+    assert retriever.texts_of([0, 1, 2]) == [f"rewrite {n} " * (n % 7 + 1) for n in (48, 49, 47)]
+
+
+def test_readers_keep_their_snapshot():
+    rng = random.Random(0)
+    retriever = SimpleRetriever([random_doc(rng) for _ in range(30)], embedding_model=HashEmbeddings(dim=32),
+                                eager=True, compact_ratio=0.1)
+    old = retriever._snapshot
+    old_texts = list(old.texts)
+    old_bm25 = old.bm25.search_many(QUERIES, 5)
+    old_dense = old.indexes["cosine"].search(np.ones(32, dtype=np.float32), 5)
+
+    churn(retriever, seed=2)  # compacts several times
+    assert retriever._snapshot.version > old.version
+    assert list(old.texts) == old_texts
+    for before, after in zip(old_bm25, old.bm25.search_many(QUERIES, 5)):
+        for a, b in zip(before, after):
+            np.testing.assert_array_equal(a, b)
+    for a, b in zip(old_dense, old.indexes["cosine"].search(np.ones(32, dtype=np.float32), 5)):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_deleted_documents_are_never_returned():
+    retriever = SimpleRetriever(["python engineer", "python developer", "sql analyst"],
+                                embedding_model=HashEmbeddings(dim=32), eager=True, compact_ratio=1e9)
+    retriever.delete_documents([0])
+    for retriever_type in ("bm25", "faiss", "hybrid"):
+        _, hits = retriever.retrieve("python engineer", retriever_type, top_k=5)
+        assert 0 not in [h["id"] for h in hits]
+    assert retriever.texts_of([0]) == [None]
+    with pytest.raises(KeyError):
+        retriever.delete_documents([0])
+    with pytest.raises(KeyError):
+        retriever.update_documents({99: "unknown"})